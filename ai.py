@@ -1,200 +1,597 @@
 import heapq
+import itertools
+import math
 import random
+import time
 from collections import Counter
 
-def a_star_search(hand, top_card, current_color):
+from card import is_playable
+from cardcodes import (encode_hand, kind_of, color_id, find_card,
+                       evaluate_counts, hand_cost_counts, choose_color_counts, take, put,
+                       IS_WILD, IS_SPECIAL, KIND_COLOR, KIND_VALUE, PLAYABLE, HAND_SIZE, EVALUATE_TERMS,
+                       EVALUATE_WEIGHTS)
+from transposition import TranspositionTable
+from budget import SearchBudget, BudgetExhausted
+from searchstats import DecisionStats, HOOKS, publish
+from endgame import NO_MOVE
+
+# Deepest iteration iterative_expectimax will try
+MAX_DEPTH = 24
+# Expansions a_star_search makes per decision unless told otherwise
+A_STAR_EXPANSIONS = 100
+# How likely expectimax takes the opponent to answer a card with a normal
+# card, with a +2 or +4, or by drawing, unless an OpponentModel says otherwise
+CHANCE_WEIGHTS = (0.7, 0.2, 0.1)
+# Most that playing one card can raise evaluate_hand by, short of emptying the hand
+MAX_GAIN = -min(EVALUATE_WEIGHTS)
+# Slack added to the bounds used for pruning, far above the rounding error of
+# the weighted sums and far below any difference between two moves' values
+BOUND_SLACK = 1e-6
+# PLAYABLE with the cards whose play raises evaluate_hand most first, the
+# order in which expectimax's max nodes try them
+ORDERED_PLAYABLE = [[sorted(kinds, key=EVALUATE_WEIGHTS.__getitem__) for kinds in by_value]
+                    for by_value in PLAYABLE]
+
+def a_star_search(hand, top_card, current_color, max_expansions=A_STAR_EXPANSIONS, budget=None,
+                  stats=None):
+    """Best-first search for a sequence of plays that empties the hand.
+    
+    A state is the hand multiset with the top card's value and the active color.
+    States are expanded in order of calculate_hand_cost, and paths are kept as
+    (card, parent) pointers. The search stops at an empty hand, after
+    max_expansions expansions, or when budget runs out of time, of nodes or of
+    room for more nodes in memory. It returns the first card on the path to
+    the best state expanded, or None when nothing can be played.
+    If stats is a dict, the expanded and generated node counts and the
+    expansion rate are stored in it.
+    """
+    start = time.perf_counter()
     
     frontier = []
     explored = set()
+    tiebreak = itertools.count()
     
-    initial_state = (calculate_hand_cost(hand), tuple(hand), [], current_color)
+    counts = encode_hand(hand)
+    initial_state = (hand_cost_counts(counts), next(tiebreak), counts.tobytes(),
+                     KIND_VALUE[kind_of(top_card)], color_id(current_color), None)
     heapq.heappush(frontier, initial_state)
     
-    while frontier and len(frontier) < 100:  
-        cost, current_hand, path, current_active_color = heapq.heappop(frontier)
+    best_path = None
+    best_cost = float('inf')
+    expanded = 0
+    generated = 0
+    
+    while frontier and expanded < max_expansions:
+        cost, _, hand_key, top_value, current_active_color, path = heapq.heappop(frontier)
         
-        hand_key = tuple((card.color, card.value) for card in current_hand)
-        if hand_key in explored:
+        state_key = (hand_key, top_value, current_active_color)
+        if state_key in explored:
             continue
         
-        explored.add(hand_key)
-        
-        if not current_hand or (path and len(current_hand) <= len(hand) - 3):
-            return path[0] if path else None
+        if budget is not None:
+            try:
+                budget.charge()
+                # Expanding adds a frontier entry per distinct card at most
+                budget.hold(len(frontier) + len(explored) + hand_key[HAND_SIZE])
+            except BudgetExhausted:
+                break
         
-        playable_cards = [card for card in current_hand 
-                         if card.color == current_active_color or 
-                            card.value == top_card.value or 
-                            card.is_wild() or 
-                            card.is_plus_four()]
+        explored.add(state_key)
+        expanded += 1
         
-        if not playable_cards and not path:
-            return None
+        if path is not None and cost < best_cost:
+            best_path = path
+            best_cost = cost
         
-        if playable_cards and path:
-            return path[0]
+        if not hand_key[HAND_SIZE]:
+            break
         
-        for card in playable_cards:
-            new_hand = list(current_hand)
-            new_hand.remove(card)
+        for kind in PLAYABLE[current_active_color][top_value]:
+            if not hand_key[kind]:
+                continue
             
-            new_color = current_active_color
-            if card.is_wild() or card.is_plus_four():
-                new_color = choose_color(new_hand)
-            elif card.color != "Wild":
-                new_color = card.color
+            new_counts = bytearray(hand_key)
+            take(new_counts, kind)
             
-            new_cost = calculate_hand_cost(new_hand)
+            if IS_WILD[kind]:
+                new_color = choose_color_counts(new_counts)
+            else:
+                new_color = KIND_COLOR[kind]
             
-            if card.is_special():
+            new_cost = hand_cost_counts(new_counts)
+            
+            if IS_SPECIAL[kind]:
                 new_cost -= 2
             
-            new_path = path + [card]
-            heapq.heappush(frontier, (new_cost, tuple(new_hand), new_path, new_color))
+            generated += 1
+            heapq.heappush(frontier, (new_cost, next(tiebreak), bytes(new_counts),
+                                      KIND_VALUE[kind], new_color, (kind, path)))
+    
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats["expanded"] = expanded
+        stats["generated"] = generated
+        stats["seconds"] = seconds
+        stats["nodes_per_sec"] = expanded / seconds if seconds else 0.0
+    
+    if best_path is None:
+        return None
     
-    return path[0] if path else None
+    while best_path[1] is not None:
+        best_path = best_path[1]
+    return find_card(hand, best_path[0])
+
+def new_table(budget=None):
+    """Return a transposition table for one decision, as large as budget lets a search keep."""
+    if budget is not None and budget.max_stored is not None:
+        return TranspositionTable(budget.max_stored)
+    return TranspositionTable()
 
 def calculate_hand_cost(hand):
     """Calculate the cost of a hand state (lower is better)."""
-    if not hand:
-        return -1000
-    
-    cost = len(hand) * 10
-    special_cards = sum(1 for card in hand if card.is_special())
-    cost -= special_cards * 5
+    return hand_cost_counts(encode_hand(hand))
+
+def expectimax(hand, top_card, current_color, depth=2, table=None, budget=None, opponent=None,
+               playable_cards=None):
+    """Pick the card with the best expectimax value depth levels down, or None when nothing can be played.
     
-    wild_cards = sum(1 for card in hand if card.is_wild() or card.is_plus_four())
-    cost += wild_cards * 3
+    playable_cards, the playable cards in hand order, saves scanning the hand
+    again when the caller already has them.
+    """
     
-    colors = set(card.color for card in hand if card.color != "Wild")
-    cost -= len(colors) * 2
+    if table is None:
+        table = new_table(budget)
     
-    return cost
-
-def expectimax(hand, top_card, current_color, depth=2):
+    counts = encode_hand(hand)
+    top_kind = kind_of(top_card)
+    active_color = color_id(current_color)
     
-    playable_cards = [card for card in hand 
-                     if card.color == current_color or 
-                        card.value == top_card.value or 
-                        card.is_wild() or 
-                        card.is_plus_four()]
+    if playable_cards is None:
+        playable_cards = [card for card in hand if is_playable(card, top_card, current_color)]
     
     if not playable_cards:
         return None
     
+    # Cards are tried best first, but ties still go to the card earliest in hand
+    first_cards = {}
+    for index, card in enumerate(playable_cards):
+        first_cards.setdefault(kind_of(card), (index, card))
+    order = sorted(first_cards, key=EVALUATE_WEIGHTS.__getitem__)
+    
     best_card = None
+    best_index = len(playable_cards)
     best_value = float('-inf')
     
-    for card in playable_cards:
-        new_hand = list(hand)
-        new_hand.remove(card)
+    for kind in order:
+        index, card = first_cards[kind]
+        # A card earlier in hand must only be no worse to win, so only a
+        # bound below the best value so far may cut it off
+        alpha = best_value if index > best_index else math.nextafter(best_value, -math.inf)
         
-        value = expectimax_value(new_hand, card, top_card, current_color, depth, True)
+        take(counts, kind)
+        value = expectimax_value(counts, kind, top_kind, active_color, depth, True, table, budget, opponent,
+                                 alpha)
+        put(counts, kind)
         
-        if value > best_value:
+        if value > best_value or (value == best_value and index < best_index):
             best_value = value
+            best_index = index
             best_card = card
     
     return best_card
 
-def expectimax_value(hand, played_card, top_card, current_color, depth, is_chance_node):
-    """Recursive function to calculate expectimax value."""
-    if depth == 0 or not hand:
-        return evaluate_hand(hand)
+def iterative_expectimax(hand, top_card, current_color, budget, max_depth=MAX_DEPTH, table=None,
+                         opponent=None, playable_cards=None):
+    """Run expectimax one level deeper at a time until the budget runs out.
     
-    new_color = current_color
-    if played_card.is_wild() or played_card.is_plus_four():
-        new_color = choose_color(hand)
-    elif played_card.color != "Wild":
-        new_color = played_card.color
+    Each iteration searches the previous best card first, so a partly finished
+    iteration can still replace it. Returns the best card found and records the
+    deepest completed iteration in budget.depth_reached. playable_cards is
+    as in expectimax.
+    """
+    if table is None:
+        table = new_table(budget)
+    
+    top_kind = kind_of(top_card)
+    active_color = color_id(current_color)
+    
+    if playable_cards is None:
+        playable_cards = [card for card in hand if is_playable(card, top_card, current_color)]
+    
+    candidates = {}
+    for card in playable_cards:
+        candidates.setdefault(kind_of(card), card)
+    
+    if not candidates:
+        return None
+    
+    best_kind = next(iter(candidates))
+    # Deeper than two levels per card in hand cannot change any value
+    max_depth = min(max_depth, 2 * len(hand))
+    
+    try:
+        for depth in range(1, max_depth + 1):
+            counts = encode_hand(hand)
+            order = [best_kind] + [kind for kind in candidates if kind != best_kind]
+            iteration_value = float('-inf')
+            
+            for kind in order:
+                take(counts, kind)
+                value = expectimax_value(counts, kind, top_kind, active_color, depth, True, table, budget,
+                                         opponent, iteration_value)
+                put(counts, kind)
+                
+                if value > iteration_value:
+                    iteration_value = value
+                    best_kind = kind
+            
+            budget.depth_reached = depth
+    except BudgetExhausted:
+        pass
+    
+    return candidates[best_kind]
+
+def expectimax_value(counts, played_kind, top_kind, current_color, depth, is_chance_node, table=None,
+                     budget=None, opponent=None, alpha=-math.inf):
+    """Recursive function to calculate expectimax value.
+    
+    The hand is a count vector that is updated in place and restored before returning;
+    cards and colors are cardcodes kind and color ids. Chance nodes weigh the
+    opponent's answers by opponent, an OpponentModel, if given.
+    
+    A caller that only needs values above alpha gets the exact value when it
+    is above alpha and otherwise an upper bound on it no greater than alpha,
+    which lets chance nodes whose value cannot reach alpha be cut off (Star1).
+    """
+    if depth == 0 or not counts[HAND_SIZE]:
+        return evaluate_counts(counts)
+    
+    if table is None:
+        if budget is not None:
+            budget.charge()
+        return expectimax_node(counts, played_kind, depth, is_chance_node, table, budget, opponent, alpha)
+    
+    # The value only depends on the hand multiset, the card just played and
+    # the remaining depth: the active color is derived from the played card.
+    # With a model it also depends on what the model believed at the time.
+    key = (counts.tobytes(), played_kind, depth, is_chance_node)
+    if opponent is not None:
+        key += (opponent.token,)
+    value = table.get(key)
+    if value is None:
+        if budget is not None:
+            budget.charge()
+        value = expectimax_node(counts, played_kind, depth, is_chance_node, table, budget, opponent, alpha)
+        # Values at or below alpha may only be bounds
+        if value > alpha:
+            table.store(key, value)
+    return value
+
+def value_bound(counts, depth, is_chance_node):
+    """Upper bound on the expectimax value of a node, from the bounds of evaluate_hand.
+    
+    Every leaf below the node is the hand less the cards still to be played,
+    and playing a card raises the evaluation by MAX_GAIN at most.
+    """
+    if depth == 0:
+        return evaluate_counts(counts)
+    plays = depth // 2 if is_chance_node else (depth + 1) // 2
+    if counts[HAND_SIZE] <= plays:
+        return EVALUATE_TERMS[0] + BOUND_SLACK
+    return evaluate_counts(counts) + MAX_GAIN * plays + BOUND_SLACK
+
+def expectimax_node(counts, played_kind, depth, is_chance_node, table, budget, opponent=None,
+                    alpha=-math.inf):
+    """Expand one expectimax node without consulting the transposition table."""
+    if IS_WILD[played_kind]:
+        new_color = choose_color_counts(counts)
+    else:
+        new_color = KIND_COLOR[played_kind]
     
     if is_chance_node:
+        if opponent is None:
+            play, penalty, draw = CHANCE_WEIGHTS
+        else:
+            play, penalty, draw = opponent.chance_weights(played_kind, new_color)
+        
+        penalty_value = evaluate_counts(counts) - 10
+        
+        # The opponent playing a card and drawing both leave the bot to move
+        # with the same hand, so one reply stands for both: Star1 cuts the node
+        # off when even that reply's best possible value leaves it at alpha or
+        # below, and otherwise asks the reply only for values that could not
+        # leave it there, telling the reply to stop as soon as it is sure
+        # to come out at child_alpha or below
+        child_alpha = -math.inf
+        if alpha > -math.inf and play + draw > 0:
+            bound = value_bound(counts, depth - 1, False)
+            value = 0
+            value += play * bound
+            value += penalty * penalty_value
+            value += draw * bound
+            if value <= alpha:
+                return value
+            child_alpha = (alpha - BOUND_SLACK - penalty * penalty_value) / (play + draw)
+        
+        reply = expectimax_value(counts, played_kind, played_kind, new_color, depth-1, False, table, budget,
+                                 opponent, child_alpha)
+        
         value = 0
         
-        value += 0.7 * expectimax_value(hand, played_card, played_card, new_color, depth-1, False)
+        value += play * reply
         
-        value += 0.2 * (evaluate_hand(hand) - 10)
+        value += penalty * penalty_value
         
-        value += 0.1 * expectimax_value(hand, played_card, played_card, new_color, depth-1, False)
+        value += draw * reply
         
         return value
     
     else:
-        playable_cards = [card for card in hand 
-                         if card.color == new_color or 
-                            card.value == played_card.value or 
-                            card.is_wild() or 
-                            card.is_plus_four()]
+        playable = [kind for kind in ORDERED_PLAYABLE[new_color][KIND_VALUE[played_kind]] if counts[kind]]
         
-        if not playable_cards:
-            return evaluate_hand(hand) - 5
+        if not playable:
+            return evaluate_counts(counts) - 5
         
         best_value = float('-inf')
-        for card in playable_cards:
-            new_hand = list(hand)
-            new_hand.remove(card)
-            value = expectimax_value(new_hand, card, played_card, new_color, depth-1, True)
+        for kind in playable:
+            take(counts, kind)
+            value = expectimax_value(counts, kind, played_kind, new_color, depth-1, True, table, budget, opponent,
+                                     max(alpha, best_value))
+            put(counts, kind)
             best_value = max(best_value, value)
         
         return best_value
 
 def evaluate_hand(hand):
     """Evaluate the quality of a hand (higher is better)."""
-    if not hand:
-        return 1000
-    
-    score = 0
-    
-    score -= len(hand) * 10
-    
-    score += sum(5 for card in hand if card.is_special())
-    
-    colors = set(card.color for card in hand if card.color != "Wild")
-    score += len(colors) * 3
-    
-    score += sum(8 for card in hand if card.is_wild() or card.is_plus_four())
-    
-    return score
+    return evaluate_counts(encode_hand(hand))
 
-def get_best_move(hand, top_card, current_color=None):
+def get_best_move(hand, top_card, current_color=None, rng=None, table=None, budget_ms=None, budget=None,
+                  stats=None, opponent_cards=None, opponent=None, rollouts=None, config=None, endgame=None,
+                  discards=()):
+    """Pick the card to play, or None when nothing can be played.
+    
+    Without a budget expectimax runs at a fixed depth. With budget_ms, or a
+    SearchBudget, it deepens until the budget is spent; budget.depth_reached
+    then tells how deep it got. A budget.SearchConfig sets the budget and the
+    deepest iteration instead, and bounds the memory the searches keep; a
+    table passed in keeps to its own max_entries. A config with neither
+    max_nodes nor ms has nothing to stop the deepening, so expectimax runs at
+    the config's fixed_depth.
+    
+    Pass a searchstats.DecisionStats as stats to have it filled in; it is also
+    handed to every hook in searchstats.HOOKS.
+    
+    Given an endgame.EndgameTable and the opponent's card count, small hands
+    are answered from the table's race model instead of searched.
+    Given an opponent.OpponentModel, expectimax weighs the opponent's answers
+    by it instead of by CHANCE_WEIGHTS.
+    
+    Given rollouts, the card that wins the most of that many playouts per
+    playable card is played instead of the searches' pick; the playouts run
+    together in rollout.py, which needs numpy. They deal the opponent and the
+    draw pile from the cards outside hand, the top card and discards, the
+    discard pile under the top card.
+    """
+    
+    # expectimax's fixed depth, or None to deepen until the budget is spent
+    depth = None
+    if budget is None and config is not None:
+        budget = config.budget()
+        depth = config.fixed_depth()
+    if budget is None and budget_ms is not None:
+        budget = SearchBudget(budget_ms)
+    if budget is None:
+        depth = 2
+    max_depth = MAX_DEPTH if config is None or config.max_depth is None else config.max_depth
+    
+    if rng is None:
+        rng = random
     
     if current_color is None:
         current_color = top_card.color
     
-    playable_cards = [card for card in hand 
-                     if card.color == current_color or 
-                        card.value == top_card.value or 
-                        card.is_wild() or 
-                        card.is_plus_four()]
+    # The one scan of the hand for this decision; the searches reuse it
+    playable_cards = [card for card in hand if is_playable(card, top_card, current_color)]
+    
+    if stats is not None or HOOKS:
+        return get_best_move_with_stats(hand, top_card, current_color, rng, table, budget,
+                                        stats if stats is not None else DecisionStats(), opponent_cards, opponent,
+                                        rollouts, max_depth, playable_cards, endgame, discards, depth)
+    
+    found, card = endgame_move(hand, top_card, current_color, opponent_cards, endgame)
+    if found:
+        return card
     
     if not playable_cards:
         return None
     
-    a_star_result = a_star_search(hand, top_card, current_color)
-    expectimax_result = expectimax(hand, top_card, current_color)
+    if rollouts is not None:
+        from rollout import rollout_card
+        return rollout_card(hand, top_card, current_color, opponent_cards, rollouts, rng, discards)
     
+    a_star_result = a_star_search(hand, top_card, current_color, budget=budget)
+    
+    if depth is not None:
+        if table is None:
+            table = new_table(budget)
+        expectimax_result = expectimax(hand, top_card, current_color, depth, table=table, opponent=opponent,
+                                       playable_cards=playable_cards)
+    else:
+        expectimax_result = iterative_expectimax(hand, top_card, current_color, budget, max_depth,
+                                                 table=table, opponent=opponent, playable_cards=playable_cards)
+    
+    return combine_moves(hand, a_star_result, expectimax_result, rng)[0]
+
+def get_best_moves(states, rng=None, table=None, budget_ms=None, config=None, endgame=None):
+    """get_best_move for many positions at once; return one card (or None) per position.
+    
+    states holds (hand, top_card, current_color) tuples, optionally with the
+    opponent's card count as a fourth item. rng is one generator used for the
+    positions in order, or a list with one generator per position; either way
+    the moves are the ones separate get_best_move calls would return. All the
+    positions share one search table, and a position that occurs more than
+    once, with its hand in the same order, is only searched once. A budget.SearchConfig limits each position's
+    search, and endgame is consulted, as in get_best_move.
+    """
+    states = list(states)
+    rngs = rng if isinstance(rng, list) else [rng if rng is not None else random] * len(states)
+    if table is None:
+        table = new_table(config.budget() if config is not None else None)
+    
+    # (a_star kind, expectimax kind) for every position searched so far
+    searched = {}
+    moves = []
+    for state, state_rng in zip(states, rngs):
+        hand, top_card, current_color = state[:3]
+        opponent_cards = state[3] if len(state) > 3 else None
+        if current_color is None:
+            current_color = top_card.color
+        
+        if HOOKS or budget_ms is not None or config is not None:
+            moves.append(get_best_move(hand, top_card, current_color, state_rng, table, budget_ms=budget_ms,
+                                       opponent_cards=opponent_cards, config=config, endgame=endgame))
+            continue
+        
+        found, card = endgame_move(hand, top_card, current_color, opponent_cards, endgame)
+        if found:
+            moves.append(card)
+            continue
+        
+        # expectimax breaks ties by position in hand, so the order is part of the position
+        key = (tuple(kind_of(card) for card in hand), kind_of(top_card), current_color)
+        kinds = searched.get(key)
+        if kinds is None:
+            playable_cards = [card for card in hand if is_playable(card, top_card, current_color)]
+            if not playable_cards:
+                kinds = (None, None)
+            else:
+                a_star_result = a_star_search(hand, top_card, current_color)
+                expectimax_result = expectimax(hand, top_card, current_color, table=table,
+                                               playable_cards=playable_cards)
+                kinds = tuple(kind_of(card) if card is not None else None
+                              for card in (a_star_result, expectimax_result))
+            searched[key] = kinds
+        
+        if kinds == (None, None):
+            moves.append(None)
+            continue
+        a_star_result, expectimax_result = (find_card(hand, kind) if kind is not None else None
+                                            for kind in kinds)
+        moves.append(combine_moves(hand, a_star_result, expectimax_result, state_rng)[0])
+    return moves
+
+def endgame_move(hand, top_card, current_color, opponent_cards, endgame):
+    """Look the position up in the endgame table, if any; return (found, card or None)."""
+    if endgame is None or opponent_cards is None:
+        return False, None
+    entry = endgame.lookup(hand, top_card, current_color, opponent_cards)
+    if entry is None:
+        return False, None
+    if entry[0] == NO_MOVE:
+        return True, None
+    return True, find_card(hand, entry[0])
+
+def combine_moves(hand, a_star_result, expectimax_result, rng):
+    """Choose between the A* and expectimax picks; return the card, which search it came from and why."""
     
     if not a_star_result:
-        return expectimax_result
+        return expectimax_result, "expectimax", "only_expectimax"
     if not expectimax_result:
-        return a_star_result
+        return a_star_result, "a_star", "only_a_star"
     
     if len(hand) <= 3:
         
-        return a_star_result
+        return a_star_result, "a_star", "short_hand"
     elif any(card.is_special() for card in [a_star_result, expectimax_result]):
         
-        return expectimax_result if expectimax_result.is_special() else a_star_result
+        if expectimax_result.is_special():
+            return expectimax_result, "expectimax", "special"
+        return a_star_result, "a_star", "special"
     else:
         
-        return random.choices([a_star_result, expectimax_result], weights=[0.4, 0.6])[0]
+        if rng.choices([True, False], weights=[0.4, 0.6])[0]:
+            return a_star_result, "a_star", "weighted"
+        return expectimax_result, "expectimax", "weighted"
 
-def choose_color(hand):
+def get_best_move_with_stats(hand, top_card, current_color, rng, table, budget, stats, opponent_cards=None,
+                             opponent=None, rollouts=None, max_depth=MAX_DEPTH, playable_cards=None, endgame=None,
+                             discards=(), depth=2):
+    """get_best_move, filling in stats and publishing them to the hooks.
+    
+    depth is expectimax's fixed depth, or None to deepen until budget is spent.
+    """
+    start = time.perf_counter()
+    
+    if playable_cards is None:
+        playable_cards = [card for card in hand if is_playable(card, top_card, current_color)]
+    
+    stats.hand_size = len(hand)
+    stats.playable = len(playable_cards)
+    
+    move = None
+    found, card = endgame_move(hand, top_card, current_color, opponent_cards, endgame)
+    if found:
+        move = card
+        if card is not None:
+            stats.chosen = stats.reason = "endgame"
+    elif playable_cards and rollouts is not None:
+        from rollout import rollout_card
+        move = rollout_card(hand, top_card, current_color, opponent_cards, rollouts, rng, discards)
+        stats.chosen = stats.reason = "rollout"
+    elif playable_cards:
+        a_star_stats = {}
+        a_star_result = a_star_search(hand, top_card, current_color, budget=budget, stats=a_star_stats)
+        stats.a_star_seconds = a_star_stats["seconds"]
+        stats.a_star_nodes = a_star_stats["expanded"]
+        if a_star_stats["expanded"]:
+            stats.a_star_branching = a_star_stats["generated"] / a_star_stats["expanded"]
+        
+        if table is None:
+            table = new_table(budget)
+        # Without a budget an unlimited one still counts the nodes
+        counter = budget if budget is not None else SearchBudget()
+        nodes = counter.nodes
+        hits = table.hits
+        misses = table.misses
+        
+        expectimax_start = time.perf_counter()
+        if depth is not None:
+            expectimax_result = expectimax(hand, top_card, current_color, depth, table=table,
+                                           budget=counter, opponent=opponent, playable_cards=playable_cards)
+            stats.max_depth = depth
+        else:
+            expectimax_result = iterative_expectimax(hand, top_card, current_color, budget, max_depth,
+                                                     table=table, opponent=opponent, playable_cards=playable_cards)
+            stats.max_depth = budget.depth_reached
+        stats.expectimax_seconds = time.perf_counter() - expectimax_start
+        stats.expectimax_nodes = counter.nodes - nodes
+        if stats.max_depth:
+            stats.expectimax_branching = stats.expectimax_nodes ** (1 / stats.max_depth)
+        stats.cache_hits = table.hits - hits
+        stats.cache_misses = table.misses - misses
+        
+        move, stats.chosen, stats.reason = combine_moves(hand, a_star_result, expectimax_result, rng)
+    
+    stats.seconds = time.perf_counter() - start
+    publish(stats)
+    return move
+
+def choose_color(hand, rng=None, top_card=None, opponent_cards=None, endgame=None):
+    """Pick the color to name after playing a wild card.
+    
+    Given an endgame.EndgameTable, the wild card just played and the
+    opponent's card count, the table decides for small hands.
+    """
+    if endgame is not None and top_card is not None and opponent_cards is not None:
+        color = endgame.best_color(hand, top_card, opponent_cards)
+        if color is not None:
+            return color
     
     color_counts = Counter(card.color for card in hand if card.color != "Wild")
     
     if not color_counts:
         
-        return random.choice(["Red", "Green", "Blue", "Yellow"])
+        return (rng or random).choice(["Red", "Green", "Blue", "Yellow"])
     
     return color_counts.most_common(1)[0][0]
\ No newline at end of file
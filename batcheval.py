@@ -0,0 +1,45 @@
+import numpy as np
+
+from cardcodes import (encode_hand, NUM_KINDS, NO_COLOR, KIND_COLOR,
+                       EVALUATE_TERMS, COST_TERMS, EVALUATE_WEIGHTS, COST_WEIGHTS)
+
+EVALUATE_WEIGHT_VECTOR = np.array(EVALUATE_WEIGHTS, dtype=np.int64)
+COST_WEIGHT_VECTOR = np.array(COST_WEIGHTS, dtype=np.int64)
+
+# A batch is an N x K matrix of count vectors, one hand per row, where K is
+# NUM_KINDS or VECTOR_LENGTH (the running totals of a full vector are ignored).
+# Scores match evaluate_counts and hand_cost_counts exactly since both are
+# built from EVALUATE_TERMS and COST_TERMS.
+
+# COLOR_MEMBERSHIP[kind, color] is 1 when the kind has that color
+COLOR_MEMBERSHIP = np.zeros((NUM_KINDS, NO_COLOR), dtype=np.int64)
+for kind in range(NUM_KINDS):
+    if KIND_COLOR[kind] != NO_COLOR:
+        COLOR_MEMBERSHIP[kind, KIND_COLOR[kind]] = 1
+
+
+def as_matrix(hands):
+    """Return the kind counts of a batch as an N x NUM_KINDS int64 matrix."""
+    return np.asarray(hands, dtype=np.int64).reshape(len(hands), -1)[:, :NUM_KINDS]
+
+
+def score_batch(hands, weights, terms):
+    counts = as_matrix(hands)
+    colors = np.count_nonzero(counts @ COLOR_MEMBERSHIP, axis=1)
+    scores = counts @ weights + terms[4] * colors
+    return np.where(counts.any(axis=1), scores, terms[0])
+
+
+def evaluate_batch(hands):
+    """evaluate_counts for every row of a batch, as an int64 array."""
+    return score_batch(hands, EVALUATE_WEIGHT_VECTOR, EVALUATE_TERMS)
+
+
+def hand_cost_batch(hands):
+    """hand_cost_counts for every row of a batch, as an int64 array."""
+    return score_batch(hands, COST_WEIGHT_VECTOR, COST_TERMS)
+
+
+def evaluate_hands(hands):
+    """evaluate_hand for a list of card lists."""
+    return evaluate_batch([encode_hand(hand) for hand in hands])
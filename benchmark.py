@@ -0,0 +1,299 @@
+import argparse
+import copy
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from card import Card, COLORS, VALUES
+from ai import a_star_search, expectimax, get_best_move, choose_color
+from budget import SearchBudget, SearchConfig
+from engine import Engine, play_game
+from strategies import random_move
+
+HAND_SIZES = range(1, 26)
+# How the non-number part of each corpus hand is made up
+MIXES = ("numbers", "specials", "wilds", "mixed")
+# A result this many times worse than the baseline counts as a regression
+TOLERANCE = 1.25
+# Random moves played from the deal to reach the state cloned by benchmark_clone
+MID_GAME_MOVES = 20
+# Nodes each decision may expand in benchmark_memory, enough that the memory
+# ceiling rather than the node limit stops the larger searches
+MEMORY_TEST_NODES = 2000
+
+
+def make_hand(size, mix, rng):
+    numbers = [Card(color, value) for color in COLORS for value in VALUES[:10]]
+    specials = [Card(color, value) for color in COLORS for value in VALUES[10:]]
+    wilds = [Card("Wild", "Wild"), Card("Wild", "+4")]
+
+    hand = []
+    for _ in range(size):
+        if mix == "specials" and rng.random() < 0.5:
+            pool = specials
+        elif mix == "wilds" and rng.random() < 0.4:
+            pool = wilds
+        elif mix == "mixed":
+            pool = rng.choice((numbers, specials, wilds))
+        else:
+            pool = numbers
+        hand.append(rng.choice(pool))
+    return hand
+
+
+def make_corpus(seed=0):
+    """Return the fixed list of (hand, top_card, current_color) positions."""
+    rng = random.Random(seed)
+    corpus = []
+    for size in HAND_SIZES:
+        for mix in MIXES:
+            for color in COLORS:
+                hand = make_hand(size, mix, rng)
+                top_card = Card(color, rng.choice(VALUES))
+                corpus.append((hand, top_card, color))
+    return corpus
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run_a_star(hand, top_card, color, rng):
+    stats = {}
+    a_star_search(hand, top_card, color, stats=stats)
+    return stats["expanded"]
+
+
+def run_expectimax(hand, top_card, color, rng):
+    budget = SearchBudget()
+    expectimax(hand, top_card, color, budget=budget)
+    return budget.nodes
+
+
+def run_get_best_move(hand, top_card, color, rng):
+    get_best_move(hand, top_card, color, rng)
+    return None
+
+
+def run_choose_color(hand, top_card, color, rng):
+    choose_color(hand, rng)
+    return None
+
+
+BENCHMARKS = {
+    "a_star_search": run_a_star,
+    "expectimax": run_expectimax,
+    "get_best_move": run_get_best_move,
+    "choose_color": run_choose_color,
+}
+
+
+def measure(run, corpus, repeat, seed):
+    """Time run over the corpus, then measure its peak allocation per call."""
+    rng = random.Random(seed)
+    latencies = []
+    nodes = 0
+    node_calls = 0
+    node_seconds = 0.0
+    for hand, top_card, color in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            expanded = run(hand, top_card, color, rng)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            if expanded is not None:
+                nodes += expanded
+                node_calls += 1
+                node_seconds += elapsed
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for hand, top_card, color in corpus:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            run(hand, top_card, color, rng)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "nodes_per_sec": nodes / node_seconds if node_seconds else None,
+        "nodes_per_call": nodes / node_calls if node_calls else None,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_benchmarks(names=None, repeat=5, seed=0):
+    corpus = make_corpus(seed)
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(BENCHMARKS[name], corpus, repeat, seed)
+    return {
+        "python": platform.python_version(),
+        "positions": len(corpus),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def mid_game(seed=0, moves=MID_GAME_MOVES):
+    """Return an engine after some random moves of a seeded game, with the game still on."""
+    while True:
+        engine = Engine(rng=random.Random(seed))
+        play_game(engine, [random_move, random_move], moves)
+        if engine.state.winner is None and engine.state.deck:
+            engine.state.game_over = False
+            return engine
+        seed += 1
+
+
+def benchmark_clone(repeat=2000, seed=0):
+    """Time GameState.clone against copy.deepcopy on a mid-game state.
+
+    Each is timed alone and followed by a random playout from the copy, as a
+    rollout would use it.
+    """
+    engine = mid_game(seed)
+    state = engine.state
+    rng = random.Random(seed)
+
+    results = {}
+    for name, clone in (("deepcopy", copy.deepcopy), ("clone", type(state).clone)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            clone(state)
+        alone = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            play_game(Engine(rng=rng, state=clone(state)), [random_move, random_move], 200)
+        rollout = time.perf_counter() - start
+        results[name] = {"copy_us": alone / repeat * 1e6, "rollout_us": rollout / repeat * 1e6}
+    return {
+        "hand_sizes": [len(player.hand) for player in state.players],
+        "deck": len(state.deck),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Return a message for every metric that got worse than the baseline allows."""
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_kb"):
+            if previous[metric] and result[metric] > previous[metric] * tolerance:
+                regressions.append(f"{name} {metric}: {previous[metric]:.3f} -> {result[metric]:.3f}")
+        if previous["nodes_per_sec"] and result["nodes_per_sec"] is not None:
+            if result["nodes_per_sec"] * tolerance < previous["nodes_per_sec"]:
+                regressions.append(f"{name} nodes_per_sec: {previous['nodes_per_sec']:.0f} -> "
+                                   f"{result['nodes_per_sec']:.0f}")
+    return regressions
+
+
+def benchmark_memory(max_memory_kb, max_nodes=MEMORY_TEST_NODES, seed=0):
+    """Check with tracemalloc that get_best_move keeps to a SearchConfig's memory ceiling.
+
+    Every corpus position is decided once with a fresh table, with and
+    without max_memory_kb, and the peak allocation of each call is measured;
+    positions whose bounded peak passes the ceiling are listed under "over".
+    """
+    corpus = make_corpus(seed)
+    results = {}
+    over = []
+    for name, config in (("unbounded", SearchConfig(max_nodes)),
+                         ("bounded", SearchConfig(max_nodes, max_memory_kb=max_memory_kb))):
+        rng = random.Random(seed)
+        peaks = []
+        tracemalloc.start()
+        try:
+            for index, (hand, top_card, color) in enumerate(corpus):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                get_best_move(hand, top_card, color, rng, config=config)
+                peak = tracemalloc.get_traced_memory()[1] - before
+                peaks.append(peak)
+                if config.max_memory_kb is not None and peak > max_memory_kb * 1024:
+                    over.append(index)
+        finally:
+            tracemalloc.stop()
+        peaks.sort()
+        results[name] = {
+            "p50_kb": percentile(peaks, 0.50) / 1024,
+            "p99_kb": percentile(peaks, 0.99) / 1024,
+            "peak_kb": peaks[-1] / 1024,
+        }
+    return {
+        "positions": len(corpus),
+        "max_nodes": max_nodes,
+        "max_memory_kb": max_memory_kb,
+        "results": results,
+        "over": over,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark decision latency of the ai module.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed calls per position")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-b", "--baseline", help="compare against results stored in this JSON file")
+    parser.add_argument("-t", "--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown factor before a result is a regression")
+    parser.add_argument("--clone", action="store_true",
+                        help="time game-state cloning against copy.deepcopy instead")
+    parser.add_argument("--memory", type=int, metavar="KB",
+                        help="check with tracemalloc that get_best_move stays under this memory ceiling "
+                             "instead; the exit status is non-zero when a position goes over")
+    args = parser.parse_args(argv)
+    if args.clone:
+        json.dump(benchmark_clone(seed=args.seed), sys.stdout, indent=2)
+        print()
+        return 0
+    if args.memory is not None:
+        try:
+            report = benchmark_memory(args.memory, seed=args.seed)
+        except ValueError as error:
+            parser.error(str(error))
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 1 if report["over"] else 0
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    report = run_benchmarks(args.names, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if args.baseline:
+        with open(args.baseline) as stored:
+            regressions = compare(report, json.load(stored), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
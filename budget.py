@@ -0,0 +1,95 @@
+import time
+
+# Most bytes one node kept by a search takes, an A* frontier entry or
+# explored key or a transposition table entry, as measured with tracemalloc
+NODE_BYTES = 320
+# Bytes a search allocates besides the nodes it keeps, most of them for
+# expectimax's stack at MAX_DEPTH
+SEARCH_OVERHEAD_BYTES = 32 * 1024
+
+
+class BudgetExhausted(Exception):
+    """Raised inside a search when its SearchBudget has run out."""
+
+
+class SearchBudget:
+    """Time, node and memory limits for one decision.
+
+    The clock starts when the budget is created. Another thread may call
+    cancel() to stop the search early. max_stored caps the nodes a search
+    keeps in memory at once. After the search, depth_reached and nodes tell
+    how far it got.
+    """
+
+    # How many nodes to expand between two looks at the clock
+    CHECK_EVERY = 32
+
+    def __init__(self, ms=None, max_nodes=None, max_stored=None):
+        self.deadline = time.perf_counter() + ms / 1000 if ms is not None else None
+        self.max_nodes = max_nodes
+        self.max_stored = max_stored
+        self.nodes = 0
+        self.depth_reached = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def charge(self):
+        """Count one expanded node; raise BudgetExhausted once a limit is passed."""
+        self.nodes += 1
+        if self.cancelled:
+            raise BudgetExhausted()
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExhausted()
+        if (self.deadline is not None and self.nodes % self.CHECK_EVERY == 0 and
+                time.perf_counter() > self.deadline):
+            raise BudgetExhausted()
+
+    def hold(self, count):
+        """Raise BudgetExhausted if a search keeping count nodes would pass max_stored."""
+        if self.max_stored is not None and count > self.max_stored:
+            raise BudgetExhausted()
+
+    def exhausted(self):
+        if self.cancelled:
+            return True
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return True
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+
+class SearchConfig:
+    """Limits for every decision a bot makes: nodes, depth, memory and time.
+
+    max_nodes caps the nodes each decision expands and max_depth the deepest
+    expectimax iteration. max_memory_kb caps what a search keeps in memory:
+    the nodes A* holds, and the entries of the transposition table made for
+    the decision, count NODE_BYTES each. Reaching any limit ends the search
+    with the best move found so far. Only max_nodes or ms can stop iterative
+    deepening, so with neither expectimax searches to a fixed depth instead.
+    """
+
+    def __init__(self, max_nodes=None, max_depth=None, max_memory_kb=None, ms=None):
+        if max_memory_kb is not None and max_memory_kb * 1024 <= SEARCH_OVERHEAD_BYTES:
+            raise ValueError(f"A search needs more than {SEARCH_OVERHEAD_BYTES // 1024} KB of memory.")
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.max_memory_kb = max_memory_kb
+        self.ms = ms
+
+    def max_stored(self):
+        """Nodes a search may keep in memory, or None for no limit."""
+        if self.max_memory_kb is None:
+            return None
+        return (self.max_memory_kb * 1024 - SEARCH_OVERHEAD_BYTES) // NODE_BYTES
+
+    def budget(self):
+        """Return a new SearchBudget for one decision."""
+        return SearchBudget(self.ms, self.max_nodes, self.max_stored())
+
+    def fixed_depth(self):
+        """The depth expectimax searches to at once, max_depth or 2, or None when it deepens instead."""
+        if self.max_nodes is not None or self.ms is not None:
+            return None
+        return self.max_depth if self.max_depth is not None else 2
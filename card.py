@@ -5,9 +5,45 @@ VALUES = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Skip', 'Reverse', '
 WILD_CARDS = ['Wild', '+4']
 
 class Card:
-    def __init__(self, color, value):
-        self.color = color
-        self.value = value
+    """A card of a given color and value, such as Red 5 or Wild +4.
+
+    There is one Card object per color and value: Card(color, value) always
+    returns the same one, so the two Red 5s of a deck are the same object.
+    Cards therefore compare and hash by identity, which is value equality,
+    and a hand holds references to shared cards rather than cards of its own.
+    Cards cannot be changed, and their flags are worked out when a card is
+    first made.
+    """
+    __slots__ = ("color", "value", "skip", "reverse", "plus_two", "plus_four", "wild", "special")
+    
+    # Every card made so far, by (color, value)
+    interned = {}
+    
+    def __new__(cls, color, value):
+        card = cls.interned.get((color, value))
+        if card is None:
+            card = object.__new__(cls)
+            flags = {
+                "color": color,
+                "value": value,
+                "skip": value == "Skip",
+                "reverse": value == "Reverse",
+                "plus_two": value == "+2",
+                "plus_four": value == "+4",
+                "wild": value == "Wild",
+                "special": not value.isdigit(),
+            }
+            for name, flag in flags.items():
+                object.__setattr__(card, name, flag)
+            cls.interned[(color, value)] = card
+        return card
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards cannot be changed.")
+    
+    def __reduce__(self):
+        # Unpickled and copied cards are the shared ones too
+        return Card, (self.color, self.value)
     
     def __str__(self):
         return f"{self.color} {self.value}"
@@ -18,30 +54,39 @@ class Card:
         return self.value < other.value
     
     def matches(self, other_card):
-        # Check if card matches with the top card
-        if self.is_wild() or self.is_plus_four():
-            return True  # Wild cards can be played on any card
-        return self.color == other_card.color or self.value == other_card.value
+        # Check if card matches with the top card, taking its color as active
+        return is_playable(self, other_card, other_card.color)
 
     def is_skip(self):
-        return self.value == "Skip"
+        return self.skip
 
     def is_reverse(self):
-        return self.value == "Reverse"
+        return self.reverse
     
     def is_plus_two(self):
-        return self.value == "+2"
+        return self.plus_two
     
     def is_plus_four(self):
-        return self.value == "+4"
+        return self.plus_four
     
     def is_wild(self):
-        return self.value == "Wild"
+        return self.wild
     
     def is_special(self):
-        return self.is_skip() or self.is_reverse() or self.is_plus_two() or self.is_wild() or self.is_plus_four()
+        return self.special
+
+def is_playable(card, top_card, current_color):
+    """Check if a card can be played on top_card while current_color is active.
 
-def generate_deck():
+    This is the one matching rule; everything else that decides what can be
+    played is built on it.
+    """
+    return (card.wild or card.plus_four or
+            card.color == current_color or
+            card.value == top_card.value)
+
+def new_deck():
+    """Return the 108 cards of a full deck in a fixed order."""
     deck = []
     
     # Add regular cards
@@ -59,5 +104,9 @@ def generate_deck():
         deck.append(Card("Wild", "Wild"))
         deck.append(Card("Wild", "+4"))
     
-    random.shuffle(deck)
+    return deck
+
+def generate_deck(rng=None):
+    deck = new_deck()
+    (rng or random).shuffle(deck)
     return deck
\ No newline at end of file
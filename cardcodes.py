@@ -0,0 +1,140 @@
+from array import array
+
+from card import Card, COLORS, VALUES, WILD_CARDS, is_playable
+
+# Each of the 54 distinct cards gets a small integer id ("kind"): the 52
+# colored cards come first in color-major order, then Wild and +4.
+KINDS = ([(color, value) for color in COLORS for value in VALUES] +
+         [("Wild", value) for value in WILD_CARDS])
+NUM_KINDS = len(KINDS)
+KIND_IDS = {kind: i for i, kind in enumerate(KINDS)}
+
+WILD = KIND_IDS[("Wild", "Wild")]
+PLUS_FOUR = KIND_IDS[("Wild", "+4")]
+
+# Color ids follow COLORS; NO_COLOR stands for "Wild" as an active color
+COLOR_IDS = {color: i for i, color in enumerate(COLORS)}
+NO_COLOR = len(COLORS)
+VALUE_IDS = {value: i for i, value in enumerate(VALUES + WILD_CARDS)}
+
+KIND_COLOR = array('b', [COLOR_IDS.get(color, NO_COLOR) for color, _ in KINDS])
+KIND_VALUE = array('b', [VALUE_IDS[value] for _, value in KINDS])
+
+IS_WILD = array('b', [value in WILD_CARDS for _, value in KINDS])
+IS_SPECIAL = array('b', [not value.isdigit() for _, value in KINDS])
+IS_SKIP = array('b', [value == "Skip" for _, value in KINDS])
+IS_REVERSE = array('b', [value == "Reverse" for _, value in KINDS])
+IS_PLUS_TWO = array('b', [value == "+2" for _, value in KINDS])
+IS_PLUS_FOUR = array('b', [value == "+4" for _, value in KINDS])
+
+# A hand is a count vector: one count per kind, followed by running totals
+# that take() and put() keep up to date so the hand can be scored in O(1).
+# COLOR_TOTALS + color id holds the number of cards of that color, with the
+# NO_COLOR slot counting wild cards.
+COLOR_TOTALS = NUM_KINDS
+HAND_SIZE = COLOR_TOTALS + NO_COLOR + 1
+SPECIALS = HAND_SIZE + 1
+VECTOR_LENGTH = SPECIALS + 1
+
+WILDS = COLOR_TOTALS + NO_COLOR
+COLORED = slice(COLOR_TOTALS, COLOR_TOTALS + NO_COLOR)
+KIND_TOTAL = array('b', [COLOR_TOTALS + KIND_COLOR[k] for k in range(NUM_KINDS)])
+
+# Terms of evaluate_hand (higher is better) and calculate_hand_cost (lower is
+# better): (empty hand, per card, per special card, per wild card, per color)
+EVALUATE_TERMS = (1000, -10, 5, 8, 3)
+COST_TERMS = (-1000, 10, -5, 3, -2)
+
+# The per-card terms folded into one weight per kind, for batch evaluation
+EVALUATE_WEIGHTS = array('i', [EVALUATE_TERMS[1] + EVALUATE_TERMS[2] * IS_SPECIAL[k] + EVALUATE_TERMS[3] * IS_WILD[k]
+                               for k in range(NUM_KINDS)])
+COST_WEIGHTS = array('i', [COST_TERMS[1] + COST_TERMS[2] * IS_SPECIAL[k] + COST_TERMS[3] * IS_WILD[k]
+                           for k in range(NUM_KINDS)])
+
+# The card of each kind, and the kind of each card
+KIND_CARDS = [Card(color, value) for color, value in KINDS]
+CARD_KINDS = {card: kind for kind, card in enumerate(KIND_CARDS)}
+
+# PLAYABLE[color][value] lists the kinds that can go on a top card with that
+# value while that color is active. is_playable is asked with a real card of
+# each value, so no card outside the deck is ever interned.
+PLAYABLE = [[tuple(k for k, card in enumerate(KIND_CARDS) if is_playable(card, top_card, active_color))
+             for top_card in [next(card for card in KIND_CARDS if card.value == top_value)
+                              for top_value in VALUE_IDS]]
+            for active_color in COLORS + ["Wild"]]
+
+
+def kind_of(card):
+    return CARD_KINDS[card]
+
+
+def card_of(kind):
+    return KIND_CARDS[kind]
+
+
+def color_id(color):
+    return COLOR_IDS.get(color, NO_COLOR)
+
+
+def encode_hand(hand):
+    """Return the count vector of a list of cards."""
+    counts = array('B', bytes(VECTOR_LENGTH))
+    for card in hand:
+        put(counts, CARD_KINDS[card])
+    return counts
+
+
+def decode_hand(counts):
+    """Return the (interned) cards of a count vector as a list, in kind order."""
+    return [card_of(kind) for kind in range(NUM_KINDS) for _ in range(counts[kind])]
+
+
+def take(counts, kind):
+    """Remove one card of the given kind from a count vector in place."""
+    counts[kind] -= 1
+    counts[KIND_TOTAL[kind]] -= 1
+    counts[HAND_SIZE] -= 1
+    counts[SPECIALS] -= IS_SPECIAL[kind]
+
+
+def put(counts, kind):
+    """Add one card of the given kind to a count vector in place."""
+    counts[kind] += 1
+    counts[KIND_TOTAL[kind]] += 1
+    counts[HAND_SIZE] += 1
+    counts[SPECIALS] += IS_SPECIAL[kind]
+
+
+def find_card(hand, kind):
+    """Return the card of the given kind if it is in hand, or None."""
+    card = KIND_CARDS[kind]
+    return card if card in hand else None
+
+
+def score_counts(counts, terms):
+    size = counts[HAND_SIZE]
+    if not size:
+        return terms[0]
+    empty, per_card, per_special, per_wild, per_color = terms
+    return (per_card * size + per_special * counts[SPECIALS] + per_wild * counts[WILDS] +
+            per_color * (NO_COLOR - counts[COLORED].count(0)))
+
+
+def evaluate_counts(counts):
+    """evaluate_hand for a count vector."""
+    return score_counts(counts, EVALUATE_TERMS)
+
+
+def hand_cost_counts(counts):
+    """calculate_hand_cost for a count vector."""
+    return score_counts(counts, COST_TERMS)
+
+
+def choose_color_counts(counts):
+    """choose_color for a count vector; ties go to the color listed first in COLORS.
+
+    With no colored card left the choice cannot matter to a search, so the
+    first color is taken rather than a random one.
+    """
+    color_totals = counts[COLORED]
+    return color_totals.index(max(color_totals))
@@ -0,0 +1,122 @@
+import random
+from array import array
+
+from card import new_deck
+
+# The cards of a full deck, created once and shared by every game's Deck
+CARDS = tuple(new_deck())
+
+
+def index_cards(cards):
+    """Map each card to a position in cards that holds it."""
+    return {card: i for i, card in enumerate(cards)}
+
+
+CARD_INDEX = index_cards(CARDS)
+CARD_ORDER = array('H', range(len(CARDS)))
+
+
+class Deck:
+    """Draw pile and discard pile of one game, kept in one preallocated array.
+
+    The array holds positions in cards, a table of card objects that is never
+    copied. The draw pile fills the array from the front with its top card at
+    size - 1; the discard pile fills it from the back with the latest discard
+    at bottom. Cards in the players' hands are in neither, so the two never
+    meet. Drawing, discarding and shuffling only move small integers around.
+    """
+
+    def __init__(self, cards=CARDS):
+        """Create a deck of cards in the given order, the last card on top."""
+        self.cards = cards
+        if cards is CARDS:
+            self.index = CARD_INDEX
+            self.slots = array('H', CARD_ORDER)
+        else:
+            self.index = index_cards(cards)
+            self.slots = array('H', range(len(cards)))
+        self.size = len(cards)
+        self.bottom = len(cards)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the draw pile from the bottom card to the top card."""
+        cards = self.cards
+        slots = self.slots
+        for i in range(self.size):
+            yield cards[slots[i]]
+
+    def copy(self):
+        deck = Deck.__new__(Deck)
+        deck.cards = self.cards
+        deck.index = self.index
+        deck.slots = array('H', self.slots)
+        deck.size = self.size
+        deck.bottom = self.bottom
+        return deck
+
+    def pop(self):
+        """Remove and return the top card of the draw pile."""
+        size = self.size - 1
+        if size < 0:
+            raise IndexError("pop from an empty deck")
+        self.size = size
+        return self.cards[self.slots[size]]
+
+    def put_back(self, cards):
+        """Put cards back on top of the draw pile, the last one on top."""
+        slots = self.slots
+        index = self.index
+        for card in cards:
+            slots[self.size] = index[card]
+            self.size += 1
+
+    def discard(self, card):
+        self.bottom -= 1
+        self.slots[self.bottom] = self.index[card]
+
+    def discards(self):
+        """Return the discard pile from the first discard to the latest one."""
+        return [self.cards[self.slots[i]] for i in range(len(self.slots) - 1, self.bottom - 1, -1)]
+
+    def collect_discards(self):
+        """Move every discard but the latest one onto the draw pile, unshuffled.
+
+        Return False when there is nothing to collect from.
+        """
+        slots = self.slots
+        end = len(slots)
+        if self.bottom == end:
+            return False
+
+        latest = slots[self.bottom]
+        start = self.size
+        count = end - self.bottom - 1
+        # Slide the discards down onto the draw pile; the copy runs upwards
+        # and the draw pile ends below the discard pile, so no discard is
+        # overwritten before it is moved. Then reverse them in place, so that
+        # they lie in the order they were discarded.
+        for i in range(count):
+            slots[start + i] = slots[self.bottom + 1 + i]
+        low, high = start, start + count - 1
+        while low < high:
+            slots[low], slots[high] = slots[high], slots[low]
+            low += 1
+            high -= 1
+        slots[end - 1] = latest
+        self.size += count
+        self.bottom = end - 1
+        return True
+
+    def shuffle(self, rng=None):
+        """Shuffle the draw pile in place with Fisher-Yates.
+
+        A seeded rng gives the same order every time.
+        """
+        uniform = (rng or random).random
+        slots = self.slots
+        for i in range(self.size - 1, 0, -1):
+            j = int(uniform() * (i + 1))
+            slots[i], slots[j] = slots[j], slots[i]
@@ -0,0 +1,189 @@
+import argparse
+import mmap
+import os
+import sys
+import time
+from itertools import combinations_with_replacement
+from math import comb
+
+from card import COLORS
+from cardcodes import (NUM_KINDS, VALUE_IDS, KIND_VALUE, KIND_COLOR, PLAYABLE,
+                       IS_WILD, IS_SKIP, IS_REVERSE, IS_PLUS_TWO, IS_PLUS_FOUR, kind_of, color_id)
+
+# Endgames are scored with a heuristic race model, not solved: we play out
+# our hand while the opponent, between two of our turns, sheds one card and
+# never changes the top card or the color, nor plays a +2 or a +4.
+# Skip, Reverse and +2 let us play again at once, +2 and +4 give the opponent
+# cards, and a position where we cannot play is lost. A move's score is
+# WON - turns when it empties our hand in that many turns before the
+# opponent runs out, and LOST - cards left otherwise, so higher is better.
+WON = 255
+LOST = 127
+
+# Hands of up to this many cards are scored
+MAX_HAND = 3
+# Such a hand is played out within MAX_HAND turns, so an opponent with at
+# least this many cards can never finish first: larger counts share entries.
+MAX_OPPONENT = MAX_HAND
+
+# A position is a canonical (hand, top card, active color, opponent count):
+# the hand as a sorted multiset of card kinds, the top card by its value only
+# (its color is the active color unless it is a wild card).
+HAND_OFFSETS = [sum(comb(NUM_KINDS + smaller - 1, smaller) for smaller in range(1, size))
+                for size in range(1, MAX_HAND + 2)]
+HANDS = HAND_OFFSETS[-1]
+TOPS = len(VALUE_IDS) * len(COLORS)
+
+# Each entry is the kind of card to play (NO_MOVE when none can be played)
+# and that move's score
+NO_MOVE = 255
+ENTRY_SIZE = 2
+HEADER = b"UNOENDG1" + bytes([MAX_HAND, MAX_OPPONENT, NUM_KINDS, len(VALUE_IDS)])
+
+ENDGAME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.bin")
+
+PLAYABLE_SETS = [[frozenset(kinds) for kinds in by_value] for by_value in PLAYABLE]
+
+
+def hand_rank(kinds):
+    """Number a sorted multiset of kinds, after all the smaller hands."""
+    return HAND_OFFSETS[len(kinds) - 1] + sum(comb(kind + i, i + 1) for i, kind in enumerate(kinds))
+
+
+def position_index(kinds, top_value, color, opponent_cards):
+    top = top_value * len(COLORS) + color
+    return (hand_rank(kinds) * TOPS + top) * MAX_OPPONENT + min(opponent_cards, MAX_OPPONENT) - 1
+
+
+def score_position(entries, kinds, top_value, color, opponent_cards):
+    """Return the best (kind, score) for a position under the race model, reading smaller hands from entries."""
+
+    def score_of(rest, value, color, opponent_cards):
+        return entries[position_index(rest, value, color, opponent_cards) * ENTRY_SIZE + 1]
+
+    best_kind = NO_MOVE
+    best_score = LOST - len(kinds)
+    playable = PLAYABLE_SETS[color][top_value]
+    for i, kind in enumerate(kinds):
+        if (i and kind == kinds[i - 1]) or kind not in playable:
+            continue
+        rest = kinds[:i] + kinds[i + 1:]
+        value = KIND_VALUE[kind]
+        if not rest:
+            score = WON - 1
+        elif IS_SKIP[kind] or IS_REVERSE[kind]:
+            score = score_of(rest, value, KIND_COLOR[kind], opponent_cards)
+        elif IS_PLUS_TWO[kind]:
+            score = score_of(rest, value, KIND_COLOR[kind], opponent_cards + 2)
+        else:
+            # The turn passes; the opponent sheds a card before our next one
+            left = opponent_cards + 4 * IS_PLUS_FOUR[kind] - 1
+            if left <= 0:
+                score = LOST - len(rest)
+            else:
+                colors = range(len(COLORS)) if IS_WILD[kind] else (KIND_COLOR[kind],)
+                score = max(score_of(rest, value, new_color, left) for new_color in colors)
+                if score > LOST:
+                    score -= 1
+        if score > best_score:
+            best_kind = kind
+            best_score = score
+    return best_kind, best_score
+
+
+def generate(path=ENDGAME_FILE):
+    """Score every endgame and write the table to path; return the number of positions."""
+    entries = bytearray(HANDS * TOPS * MAX_OPPONENT * ENTRY_SIZE)
+    for size in range(1, MAX_HAND + 1):
+        for kinds in combinations_with_replacement(range(NUM_KINDS), size):
+            for top_value in range(len(VALUE_IDS)):
+                for color in range(len(COLORS)):
+                    for opponent_cards in range(1, MAX_OPPONENT + 1):
+                        at = position_index(kinds, top_value, color, opponent_cards) * ENTRY_SIZE
+                        entries[at:at + ENTRY_SIZE] = bytes(
+                            score_position(entries, kinds, top_value, color, opponent_cards))
+
+    # Readers may have the old file mapped; replacing it leaves their copy intact
+    partial = path + ".tmp"
+    with open(partial, "wb") as out:
+        out.write(HEADER)
+        out.write(entries)
+    os.replace(partial, path)
+    return HANDS * TOPS * MAX_OPPONENT
+
+
+class EndgameTable:
+    """The endgame file, memory-mapped on first use.
+
+    Nothing is read until the first lookup, and the mapping is shared with
+    every other process that maps the same file. The searches only consult a
+    table they are handed, so a missing file is an error rather than a
+    silent change of play.
+    """
+
+    def __init__(self, path=ENDGAME_FILE):
+        self.path = path
+        self.data = None
+
+    def open(self):
+        if self.data is None:
+            with open(self.path, "rb") as table:
+                data = mmap.mmap(table.fileno(), 0, access=mmap.ACCESS_READ)
+            if data[:len(HEADER)] != HEADER:
+                data.close()
+                raise ValueError(f"{self.path} is not an endgame table for these rules.")
+            self.data = data
+        return self.data
+
+    def lookup(self, hand, top_card, current_color, opponent_cards):
+        """Return (kind to play or NO_MOVE, score) for a position, or None if it is not in the table."""
+        color = color_id(current_color)
+        if not hand or len(hand) > MAX_HAND or opponent_cards < 1 or color >= len(COLORS):
+            return None
+        data = self.open()
+        kinds = sorted(kind_of(card) for card in hand)
+        index = position_index(kinds, KIND_VALUE[kind_of(top_card)], color, opponent_cards)
+        at = len(HEADER) + index * ENTRY_SIZE
+        return data[at], data[at + 1]
+
+    def best_color(self, hand, top_card, opponent_cards):
+        """Return the color to pick after playing the wild top_card, or None if the table does not say."""
+        left = opponent_cards + 4 * top_card.is_plus_four() - 1
+        if not hand or left < 1:
+            return None
+        best_color = None
+        best_score = -1
+        for color in COLORS:
+            entry = self.lookup(hand, top_card, color, left)
+            if entry is None:
+                return None
+            if entry[1] > best_score:
+                best_color = color
+                best_score = entry[1]
+        return best_color
+
+
+# Tables opened so far by path, so that every game a process plays shares one mapping
+TABLES = {}
+
+
+def endgame_table(path=ENDGAME_FILE):
+    """Return the EndgameTable for the file at path, opened once per process."""
+    if path not in TABLES:
+        TABLES[path] = EndgameTable(path)
+    return TABLES[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score every small-hand endgame with the race model and write the table.")
+    parser.add_argument("-o", "--output", default=ENDGAME_FILE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    positions = generate(args.output)
+    print(f"Scored {positions} positions in {time.perf_counter() - start:.1f}s; wrote {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
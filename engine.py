@@ -0,0 +1,305 @@
+import random
+from collections import namedtuple
+
+from card import COLORS, is_playable
+from deck import Deck
+from player import Player
+from ai import get_best_move, choose_color
+
+PLAY = "play"
+DRAW = "draw"
+COLOR = "color"
+
+HUMAN = 0
+BOT = 1
+
+# Events passed to an Engine listener as listener(event, player, value), on
+# top of PLAY (value: card), DRAW (card, or None when nothing was left to draw)
+# and COLOR (color). START carries the deck before dealing, PENALTY a card
+# drawn because of a +2 or +4, RESHUFFLE the new deck order.
+START = "start"
+PENALTY = "penalty"
+RESHUFFLE = "reshuffle"
+
+# kind is PLAY, DRAW or COLOR; card is set for PLAY, color for COLOR
+Move = namedtuple("Move", ["kind", "card", "color"])
+
+DRAW_MOVE = Move(DRAW, None, None)
+COLOR_MOVES = [Move(COLOR, None, color) for color in COLORS]
+
+# Key of the deck in GameState.owned, next to the player indices
+DECK = "deck"
+
+
+class GameState:
+    """Complete state of a two-player game, with no UI attached."""
+
+    def __init__(self, deck):
+        # Draw pile and discard pile; the top card is kept apart from both
+        self.deck = deck
+        self.players = [Player("Human"), Player("Bot")]
+        self.top_card = None
+        self.current_color = None
+        self.turn = HUMAN
+        self.game_over = False
+        self.winner = None
+        self.waiting_for_color_choice = False
+        # Card just drawn by the player to move, if it can be played right away
+        self.drawn_card = None
+        self.reshuffles = 0
+        # The parts this state may change in place: DECK and player indices.
+        # The others may be shared with clones and are copied on first write.
+        self.owned = {DECK, HUMAN, BOT}
+
+    def clone(self):
+        """Return an independent copy of the state in constant time.
+
+        The copy shares the deck and the players with this state until either
+        of the two changes them; own_deck and own_player copy them first.
+        """
+        clone = GameState.__new__(GameState)
+        clone.__dict__.update(self.__dict__)
+        clone.players = list(self.players)
+        self.owned = set()
+        clone.owned = set()
+        return clone
+
+    def restore(self, snapshot):
+        """Put the state back to a clone taken earlier, which stays usable."""
+        self.__dict__.update(snapshot.clone().__dict__)
+
+    def own_deck(self):
+        """Return the deck, ready to be changed."""
+        if DECK not in self.owned:
+            self.deck = self.deck.copy()
+            self.owned.add(DECK)
+        return self.deck
+
+    def own_player(self, index):
+        """Return the player at index, ready to be changed."""
+        if index not in self.owned:
+            self.players[index] = self.players[index].copy()
+            self.owned.add(index)
+        return self.players[index]
+
+    @property
+    def current_player(self):
+        return self.players[self.turn]
+
+    @property
+    def opponent(self):
+        return self.players[1 - self.turn]
+
+
+class Engine:
+    """Rules of the game as a step API: legal_moves() and apply(move)."""
+
+    def __init__(self, deck=None, rng=None, state=None, listener=None):
+        """Deal a new game from deck, or continue from an existing state.
+
+        deck is a Deck or a list of cards, the last one on top; by default a
+        full deck is shuffled with rng. listener, if given, is called with
+        every event of the game.
+        """
+        self.rng = rng if rng is not None else random
+        self.listener = listener
+        if state is not None:
+            self.state = state
+            return
+        if deck is None:
+            deck = Deck()
+            self.shuffle(deck)
+        elif not isinstance(deck, Deck):
+            deck = Deck(deck)
+        self.state = GameState(deck)
+        self.emit(START, None, list(self.state.deck))
+        self.deal()
+
+    def snapshot(self):
+        """Return a snapshot of the game that restore() can go back to, any number of times."""
+        return self.state.clone()
+
+    def restore(self, snapshot):
+        self.state.restore(snapshot)
+
+    def emit(self, event, player, value):
+        if self.listener is not None:
+            self.listener(event, player, value)
+
+    def shuffle(self, deck):
+        deck.shuffle(self.rng)
+
+    def deal(self):
+        state = self.state
+        deck = state.own_deck()
+        for _ in range(7):
+            for index in range(len(state.players)):
+                state.own_player(index).draw_card(deck)
+
+        top_card = deck.pop()
+        while top_card.is_wild() or top_card.is_plus_four():
+            deck.discard(top_card)
+            top_card = deck.pop()
+
+        state.top_card = top_card
+        state.current_color = top_card.color
+
+    def legal_moves(self):
+        """Return the moves available to the player whose turn it is."""
+        state = self.state
+        if state.game_over:
+            return []
+
+        if state.waiting_for_color_choice:
+            return list(COLOR_MOVES)
+
+        moves = [Move(PLAY, card, None) for card in
+                 state.current_player.get_playable_cards(state.top_card, state.current_color)]
+        moves.append(DRAW_MOVE)
+        return moves
+
+    def apply(self, move):
+        """Apply a move for the player whose turn it is."""
+        state = self.state
+        if state.game_over:
+            raise ValueError("The game is over.")
+
+        if state.waiting_for_color_choice:
+            if move.kind != COLOR or move.color not in COLORS:
+                raise ValueError(f"Expected a color choice, got {move}.")
+            state.current_color = move.color
+            state.waiting_for_color_choice = False
+            self.emit(COLOR, state.turn, move.color)
+            self.resolve_card(state.top_card)
+        elif move.kind == PLAY:
+            self.play(move.card)
+        elif move.kind == DRAW:
+            self.draw()
+        else:
+            raise ValueError(f"Illegal move {move}.")
+
+    def play(self, card):
+        state = self.state
+        if not is_playable(card, state.top_card, state.current_color):
+            raise ValueError(f"{card} cannot be played on {state.top_card}.")
+
+        state.own_player(state.turn).remove_card(card)
+        self.emit(PLAY, state.turn, card)
+        state.own_deck().discard(state.top_card)
+        state.top_card = card
+        state.drawn_card = None
+
+        if not state.current_player.hand:
+            state.game_over = True
+            state.winner = state.turn
+            return
+
+        if card.is_wild() or card.is_plus_four():
+            state.waiting_for_color_choice = True
+            return
+
+        state.current_color = card.color
+        self.resolve_card(card)
+
+    def resolve_card(self, card):
+        """Apply the effect of the card just played and pass the turn."""
+        state = self.state
+        opponent = 1 - state.turn
+
+        if card.is_skip() or card.is_reverse():
+            # In a 2-player game both cards give the player another turn
+            return
+        if card.is_plus_two():
+            self.draw_cards(opponent, 2)
+            return
+        if card.is_plus_four():
+            self.draw_cards(opponent, 4)
+
+        state.turn = opponent
+
+    def draw(self):
+        state = self.state
+        if not state.deck:
+            self.reshuffle_discard_pile()
+            if not state.deck:
+                self.emit(DRAW, state.turn, None)
+                state.game_over = True
+                return
+
+        player = state.own_player(state.turn)
+        player.draw_card(state.own_deck())
+
+        drawn_card = player.hand[-1]
+        self.emit(DRAW, state.turn, drawn_card)
+        if is_playable(drawn_card, state.top_card, state.current_color):
+            state.drawn_card = drawn_card
+        else:
+            state.drawn_card = None
+            state.turn = 1 - state.turn
+
+    def draw_cards(self, player_index, count):
+        state = self.state
+        for _ in range(count):
+            if not state.deck:
+                self.reshuffle_discard_pile()
+                if not state.deck:
+                    break
+            player = state.own_player(player_index)
+            player.draw_card(state.own_deck())
+            self.emit(PENALTY, player_index, player.hand[-1])
+
+    def reshuffle_discard_pile(self):
+        state = self.state
+        deck = state.own_deck()
+        if not deck.collect_discards():
+            return
+
+        self.shuffle(deck)
+        state.reshuffles += 1
+        self.emit(RESHUFFLE, None, list(state.deck))
+
+
+def bot_move(state, rng=None, table=None, budget=None, opponent=None, endgame=None):
+    """Pick the bot's move the same way the GUI bot always has.
+
+    Pass the same TranspositionTable on every turn to reuse search results,
+    a SearchBudget to bound the search, an opponent.OpponentModel that
+    follows the game to have the search use it, and an endgame.EndgameTable
+    to play small hands from it.
+    """
+    hand = state.current_player.hand
+
+    opponent_cards = len(state.opponent.hand)
+
+    if state.waiting_for_color_choice:
+        return Move(COLOR, None, choose_color(hand, rng, state.top_card, opponent_cards, endgame))
+
+    if state.drawn_card is not None:
+        return Move(PLAY, state.drawn_card, None)
+
+    card = get_best_move(hand, state.top_card, state.current_color, rng, table, budget=budget,
+                         opponent_cards=opponent_cards, opponent=opponent, endgame=endgame)
+    if card:
+        return Move(PLAY, card, None)
+    return DRAW_MOVE
+
+
+# Hosts that see this and were given an endgame table pass it on:
+# policy(state, rng, endgame=table)
+bot_move.uses_endgame = True
+
+
+def play_game(engine, policies, max_moves=None):
+    """Run a game to the end with one policy(state, rng) per player; return the winner.
+
+    A game still running after max_moves moves is stopped as a draw.
+    """
+    state = engine.state
+    moves = 0
+    while not state.game_over:
+        if max_moves is not None and moves >= max_moves:
+            state.game_over = True
+            break
+        engine.apply(policies[state.turn](state, engine.rng))
+        moves += 1
+    return state.winner
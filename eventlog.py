@@ -0,0 +1,135 @@
+from card import COLORS
+from cardcodes import kind_of, card_of, COLOR_IDS
+from engine import START, PLAY, DRAW, COLOR, PENALTY, RESHUFFLE
+
+# One tag byte per event type. START and RESHUFFLE are followed by a length
+# byte and that many card kinds, COLOR by the player and a color id, the
+# others by the player and one card kind.
+TAGS = {START: b"S", PLAY: b"P", DRAW: b"D", COLOR: b"C", PENALTY: b"F", RESHUFFLE: b"R"}
+EVENTS = {tag[0]: event for event, tag in TAGS.items()}
+# Kind written for a DRAW that found nothing left to draw, and for "no player"
+NONE = 255
+# Bytes buffered before the log is written out
+BUFFER_SIZE = 1 << 16
+# Bytes read from the log at a time
+READ_SIZE = 1 << 16
+
+
+def encode_event(event, player, value):
+    """Return the bytes of one event."""
+    tag = TAGS[event]
+    if event in (START, RESHUFFLE):
+        return tag + bytes([len(value)]) + bytes(kind_of(card) for card in value)
+    if event == COLOR:
+        return tag + bytes([player, COLOR_IDS[value]])
+    return tag + bytes([player, NONE if value is None else kind_of(value)])
+
+
+def decode_events(data):
+    """Yield (event, player, value) for every event in data, with values as kinds.
+
+    value is a list of kinds for START and RESHUFFLE, a color for COLOR, and a
+    kind or None otherwise. Raises ValueError if data ends inside an event.
+    """
+    used = yield from decode_records(data)
+    if used != len(data):
+        raise ValueError("The log ends in the middle of an event.")
+
+
+def decode_records(data):
+    """Yield the events of the whole records at the start of data; return how many bytes they take.
+
+    A record cut off by the end of data is left for the caller to complete.
+    """
+    position = 0
+    end = len(data)
+    while position < end:
+        event = EVENTS[data[position]]
+        if event in (START, RESHUFFLE):
+            if position + 2 > end or position + 2 + data[position + 1] > end:
+                break
+            length = data[position + 1]
+            yield event, None, list(data[position + 2:position + 2 + length])
+            position += 2 + length
+            continue
+        if position + 3 > end:
+            break
+        player, value = data[position + 1], data[position + 2]
+        if event == COLOR:
+            value = COLORS[value]
+        elif value == NONE:
+            value = None
+        yield event, player, value
+        position += 3
+    return position
+
+
+class EventLog:
+    """Engine listener that appends every event of every game to a binary file.
+
+    Events are buffered and written in large chunks; call flush() or close()
+    (or use it as a context manager) to make sure everything reaches the file.
+    """
+
+    def __init__(self, path, buffer_size=BUFFER_SIZE):
+        self.file = open(path, "ab")
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+
+    def __call__(self, event, player, value):
+        self.buffer += encode_event(event, player, value)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_events(path, read_size=READ_SIZE):
+    """Yield every event stored in the log at path, reading read_size bytes at a time.
+
+    Only one chunk, and the part of a record it cut off, is held at once, so
+    logs of any length stream through in constant memory.
+    """
+    pending = b""
+    with open(path, "rb") as log:
+        while True:
+            chunk = log.read(read_size)
+            if not chunk:
+                break
+            data = pending + chunk
+            used = yield from decode_records(data)
+            pending = data[used:]
+    if pending:
+        raise ValueError(f"{path} ends in the middle of an event.")
+
+
+def read_games(path):
+    """Yield the events of each game in the log, one list per game."""
+    game = None
+    for event in read_events(path):
+        if event[0] == START:
+            if game:
+                yield game
+            game = []
+        if game is not None:
+            game.append(event)
+    if game:
+        yield game
+
+
+def cards_of(kinds):
+    return [card_of(kind) for kind in kinds]
@@ -0,0 +1,233 @@
+import heapq
+import math
+import multiprocessing
+import random
+import time
+
+from cardcodes import kind_of
+from engine import Engine, Move, PLAY, DRAW, COLOR, DRAW_MOVE, COLOR_MOVES
+
+# Exploration constant of the UCB formula
+EXPLORATION = 0.7
+# Iterations per decision for ismcts_move
+ISMCTS_ITERATIONS = 300
+# Playouts still running after this many moves count as a draw
+PLAYOUT_MOVES = 1000
+
+
+class Node:
+    """Statistics for one move in the information-set tree."""
+
+    def __init__(self, player=None):
+        # Player who made the move leading to this node
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.reward = 0.0
+        # Number of iterations in which this move was legal
+        self.availability = 0
+
+    def ucb(self, exploration):
+        return (self.reward / self.visits +
+                exploration * math.sqrt(math.log(self.availability) / self.visits))
+
+
+def move_key(move):
+    """Identify a move by card kind rather than by card object."""
+    if move.kind == PLAY:
+        return (PLAY, kind_of(move.card))
+    if move.kind == COLOR:
+        return (COLOR, move.color)
+    return (DRAW,)
+
+
+def candidate_moves(state):
+    """Moves worth searching: every playable card, or a draw when there is none."""
+    if state.waiting_for_color_choice:
+        return COLOR_MOVES
+
+    moves = []
+    seen = set()
+    for card in state.current_player.get_playable_cards(state.top_card, state.current_color):
+        if card not in seen:
+            seen.add(card)
+            moves.append(Move(PLAY, card, None))
+    return moves or [DRAW_MOVE]
+
+
+def determinize(state, observer, rng, opponent=None):
+    """Copy state with the cards the observer cannot see dealt at random.
+
+    The opponent's hand and the draw pile together hold exactly the cards
+    outside the observer's hand, the discard pile and the top card, so those
+    are shuffled and dealt back out at their current sizes. Given an
+    opponent.OpponentModel, the opponent is dealt the cards it believes
+    likelier more often.
+    """
+    other = 1 - observer
+    copy = state.clone()
+    deck = copy.own_deck()
+    other_hand = state.players[other].hand
+    deck.put_back(other_hand)
+    deck.shuffle(rng)
+    if opponent is None:
+        copy.own_player(other).hand = [deck.pop() for _ in other_hand]
+    else:
+        copy.own_player(other).hand = deal_weighted(deck, len(other_hand), opponent, rng)
+    return copy
+
+
+def deal_weighted(deck, count, opponent, rng):
+    """Take count cards out of deck, each drawn with the weight the model gives it.
+
+    The rest of the deck keeps its order.
+    """
+    cards = [deck.pop() for _ in range(len(deck))]
+    # Weighted sampling without replacement: the cards with the count largest
+    # random() ** (1 / weight) are taken, those the model rules out last
+    keys = []
+    for card in cards:
+        weight = opponent.card_weight(card)
+        keys.append(rng.random() ** (1 / weight) if weight > 0 else -rng.random())
+    taken = set(heapq.nlargest(count, range(len(cards)), key=keys.__getitem__))
+    deck.put_back(reversed([card for i, card in enumerate(cards) if i not in taken]))
+    return [cards[i] for i in sorted(taken)]
+
+
+def playout(engine, rng):
+    """Finish the game with random playable moves and return the winner."""
+    state = engine.state
+    for _ in range(PLAYOUT_MOVES):
+        if state.game_over:
+            break
+        moves = candidate_moves(state)
+        engine.apply(moves[0] if len(moves) == 1 else rng.choice(moves))
+    return state.winner
+
+
+def iterate(root, state, observer, rng, exploration, opponent=None):
+    """Run one determinized selection, expansion, playout and backup."""
+    engine = Engine(rng=rng, state=determinize(state, observer, rng, opponent))
+    state = engine.state
+    node = root
+    path = [root]
+
+    while not state.game_over:
+        moves = {move_key(move): move for move in candidate_moves(state)}
+        untried = []
+        for key in moves:
+            child = node.children.get(key)
+            if child is None:
+                untried.append(key)
+            else:
+                child.availability += 1
+
+        player = state.turn
+        if untried:
+            key = rng.choice(untried)
+            child = Node(player)
+            child.availability = 1
+            node.children[key] = child
+            engine.apply(moves[key])
+            path.append(child)
+            break
+
+        key = max(moves, key=lambda key: node.children[key].ucb(exploration))
+        engine.apply(moves[key])
+        node = node.children[key]
+        path.append(node)
+
+    winner = playout(engine, rng)
+    for node in path:
+        node.visits += 1
+        if winner is None:
+            node.reward += 0.5
+        elif winner == node.player:
+            node.reward += 1.0
+
+
+def search(task):
+    """Grow one tree and return its root statistics; run in a worker process."""
+    state, iterations, deadline, seed, exploration, opponent = task
+    rng = random.Random(seed)
+    observer = state.turn
+    root = Node()
+
+    playouts = 0
+    while iterations is None or playouts < iterations:
+        if deadline is not None and time.time() > deadline:
+            break
+        iterate(root, state, observer, rng, exploration, opponent)
+        playouts += 1
+
+    return {key: (child.visits, child.reward) for key, child in root.children.items()}, playouts
+
+
+def ismcts(state, iterations=ISMCTS_ITERATIONS, budget_ms=None, processes=1, pool=None, rng=None,
+           exploration=EXPLORATION, opponent=None):
+    """Choose a move for the player to move with information-set MCTS.
+
+    With several processes every worker grows its own tree (root
+    parallelism) from a different seed, and their root visit counts are added
+    up. iterations is the total across workers; with budget_ms each worker
+    searches until the time is up, and iterations may be None to rely on
+    time alone. Pass a multiprocessing pool with at least that many processes
+    to avoid starting one per call. Given an opponent.OpponentModel, the
+    opponent's hands are dealt by it.
+
+    Returns the move and a dict with the merged visit counts, the number of
+    playouts and playouts per second.
+    """
+    if rng is None:
+        rng = random
+
+    start = time.perf_counter()
+    deadline = time.time() + budget_ms / 1000 if budget_ms is not None else None
+
+    workers = processes
+    per_worker = None if iterations is None else max(1, iterations // workers)
+    tasks = [(state, per_worker, deadline, rng.getrandbits(64), exploration, opponent) for _ in range(workers)]
+
+    if workers == 1:
+        results = [search(tasks[0])]
+    elif pool is not None:
+        results = pool.map(search, tasks)
+    else:
+        with multiprocessing.Pool(workers) as own_pool:
+            results = own_pool.map(search, tasks)
+
+    visits = {}
+    rewards = {}
+    playouts = 0
+    for root_stats, count in results:
+        playouts += count
+        for key, (child_visits, child_reward) in root_stats.items():
+            visits[key] = visits.get(key, 0) + child_visits
+            rewards[key] = rewards.get(key, 0.0) + child_reward
+
+    moves = {move_key(move): move for move in candidate_moves(state)}
+    best_key = max(moves, key=lambda key: (visits.get(key, 0), rewards.get(key, 0.0)))
+
+    seconds = time.perf_counter() - start
+    info = {
+        "visits": visits,
+        "playouts": playouts,
+        "seconds": seconds,
+        "playouts_per_sec": playouts / seconds if seconds else 0.0,
+    }
+    return moves[best_key], info
+
+
+def ismcts_move(state, rng=None):
+    """Play the move ISMCTS picks with a fixed iteration count in this process."""
+    move, _ = ismcts(state, ISMCTS_ITERATIONS, rng=rng)
+    return move
+
+
+def ismcts_bayes_move(state, rng=None, opponent=None):
+    """ismcts_move, dealing the opponent's hands by an OpponentModel."""
+    move, _ = ismcts(state, ISMCTS_ITERATIONS, rng=rng, opponent=opponent)
+    return move
+
+
+ismcts_bayes_move.tracks_opponent = True
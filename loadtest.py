@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+
+from card import Card, COLORS, is_playable
+
+# Longest reply line accepted from the server, in bytes
+MAX_LINE = 1 << 20
+
+
+class Connection:
+    """One client socket carrying the requests of many tables at once."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count()
+        self.waiting = {}
+        self.receiver = asyncio.create_task(self.receive())
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self.waiting.pop(reply.get("id"), None)
+            if future is not None:
+                future.set_result(reply)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("The server closed the connection."))
+
+    async def request(self, **request):
+        request["id"] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request["id"]] = future
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+def parse_card(text):
+    color, _, value = text.partition(" ")
+    return Card(color, value)
+
+
+def client_move(view, rng):
+    """Play like the random strategy from what the server shows the client."""
+    if view["waiting_for_color_choice"]:
+        return {"kind": "color", "color": rng.choice(COLORS)}
+    top_card = parse_card(view["top_card"])
+    playable_cards = [text for text in view["hand"]
+                      if is_playable(parse_card(text), top_card, view["current_color"])]
+    if playable_cards:
+        return {"kind": "play", "card": rng.choice(playable_cards)}
+    return {"kind": "draw"}
+
+
+class Results:
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.errors = 0
+        self.latencies = []
+
+    def report(self, seconds):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        return {
+            "games": self.games,
+            "moves": self.moves,
+            "errors": self.errors,
+            "seconds": seconds,
+            "games_per_sec": self.games / seconds if seconds else 0.0,
+            "moves_per_sec": self.moves / seconds if seconds else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+async def play_table(connection, games, seed, max_moves, results):
+    """Play games one after another on fresh tables of one connection."""
+    rng = random.Random(seed)
+    for _ in range(games):
+        reply = await connection.request(op="new", seed=rng.getrandbits(64))
+        table = reply["table"]
+        view = reply["state"]
+        for _ in range(max_moves):
+            if view["game_over"]:
+                break
+            start = time.perf_counter()
+            reply = await connection.request(op="move", table=table, move=client_move(view, rng))
+            results.latencies.append(time.perf_counter() - start)
+            if not reply["ok"]:
+                results.errors += 1
+                break
+            results.moves += 1
+            view = reply["state"]
+        results.games += 1
+        await connection.request(op="close", table=table)
+
+
+async def open_connection(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=MAX_LINE)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE)
+
+
+async def run(host, port, unix_path, tables, connections, games, seed, max_moves):
+    connections = [Connection(*await open_connection(host, port, unix_path))
+                   for _ in range(connections)]
+    results = Results()
+    start = time.perf_counter()
+    await asyncio.gather(*(play_table(connections[table % len(connections)], games, seed + table,
+                                      max_moves, results)
+                           for table in range(tables)))
+    report = results.report(time.perf_counter() - start)
+
+    report["server"] = await connections[0].request(op="metrics")
+    for connection in connections:
+        await connection.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test server.py with many simulated tables.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8765)
+    parser.add_argument("-u", "--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("-n", "--tables", type=int, default=1000, help="tables played at the same time")
+    parser.add_argument("-c", "--connections", type=int, default=10)
+    parser.add_argument("-g", "--games", type=int, default=1, help="games per table")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-m", "--max-moves", type=int, default=1000,
+                        help="client moves after which a game is abandoned")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.host, args.port, args.unix, args.tables, args.connections,
+                             args.games, args.seed, args.max_moves))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
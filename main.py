@@ -1,11 +1,19 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
-import random
-import time
+import traceback
+from tkinter import messagebox
 
-from card import Card, generate_deck
-from player import Player
-from ai import get_best_move, choose_color
+from engine import Engine, Move, PLAY, COLOR, DRAW_MOVE, HUMAN, BOT, is_playable, bot_move
+from transposition import TranspositionTable
+from budget import SearchBudget
+from thinker import BotThinker
+from eventlog import EventLog
+
+# Shortest time a bot move stays on screen before the next one, in ms
+BOT_DELAY_MS = 1000
+# Time the bot may spend searching for a move, in ms
+BOT_THINK_MS = 500
+# Every game played is appended to this file; replay it with replay.py
+EVENT_LOG = "games.log"
 
 class UNOGame:
     def __init__(self, root):
@@ -14,6 +22,10 @@ class UNOGame:
         self.root.geometry("1920x1800")
         self.root.configure(bg="#2E8B57")
         self.root.resizable(True, True)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.thinker = BotThinker(root)
+        self.event_log = EventLog(EVENT_LOG)
         
         self.reset_game()
         
@@ -22,25 +34,45 @@ class UNOGame:
         self.update_ui()
 
     def reset_game(self):
-        self.deck = generate_deck()
-        self.discard_pile = []
-        self.player = Player("Human")
-        self.bot = Player("Bot")
-        
-        for _ in range(7):
-            self.player.draw_card(self.deck)
-            self.bot.draw_card(self.deck)
-        
-        self.top_card = self.deck.pop()
-        while self.top_card.is_wild() or self.top_card.is_plus_four():
-            self.discard_pile.append(self.top_card)
-            self.top_card = self.deck.pop()
-        
-        self.discard_pile.append(self.top_card)
-        self.current_color = self.top_card.color
-        self.turn = 0
-        self.game_over = False
-        self.waiting_for_color_choice = False
+        self.thinker.cancel()
+        self.engine = Engine(listener=self.event_log)
+        self.search_table = TranspositionTable()
+
+    @property
+    def state(self):
+        return self.engine.state
+
+    @property
+    def player(self):
+        return self.state.players[HUMAN]
+
+    @property
+    def bot(self):
+        return self.state.players[BOT]
+
+    @property
+    def deck(self):
+        return self.state.deck
+
+    @property
+    def top_card(self):
+        return self.state.top_card
+
+    @property
+    def current_color(self):
+        return self.state.current_color
+
+    @property
+    def turn(self):
+        return self.state.turn
+
+    @property
+    def game_over(self):
+        return self.state.game_over
+
+    @property
+    def waiting_for_color_choice(self):
+        return self.state.waiting_for_color_choice
 
     def create_widgets(self):
         self.info_frame = tk.Frame(self.root, bg="#2E8B57")
@@ -92,8 +124,15 @@ class UNOGame:
         self.new_game_button.pack(pady=10)
         
         self.color_selection_frame = tk.Frame(self.root, bg="#2E8B57")
+        self.color_selection_shown = False
         self.color_buttons = []
         
+        # Options last applied to each widget, and the hand buttons in hand
+        # order as (card, button) pairs plus spare buttons for reuse
+        self.widget_options = {}
+        self.card_buttons = []
+        self.card_button_pool = []
+        
         for color in ["Red", "Green", "Blue", "Yellow"]:
             bg_color = {"Red": "#FF0000", "Green": "#00FF00", 
                       "Blue": "#0000FF", "Yellow": "#FFFF00"}[color]
@@ -127,24 +166,86 @@ class UNOGame:
         return "white"
 
     def is_card_playable(self, card):
-        if card.is_wild() or card.is_plus_four():
-            return True
-            
-        if card.color == self.current_color:
-            return True
-            
-        if card.value == self.top_card.value:
-            return True
-            
-        return False
+        return is_playable(card, self.state.top_card, self.state.current_color)
+
+    def configure(self, widget, **options):
+        """Apply only the options that differ from what the widget already shows."""
+        shown = self.widget_options.setdefault(widget, {})
+        changed = {key: value for key, value in options.items() if shown.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            shown.update(changed)
+
+    def take_card_button(self, card):
+        """Get a hand button for card, reusing one from the pool when possible."""
+        if self.card_button_pool:
+            card_button = self.card_button_pool.pop()
+        else:
+            card_button = tk.Button(self.hand_frame, font=("Arial", 12), width=8, height=4)
+        
+        self.configure(card_button, text=self.format_card_text(card),
+                       bg=self.get_card_color(card), fg=self.get_text_color(card))
+        card_button.config(command=lambda: self.play_hand_card(card))
+        return card_button
+
+    def update_hand(self):
+        """Bring the hand buttons in line with the player's hand, touching only what changed."""
+        hand = self.player.hand
+        # The same card can be in hand twice; each copy is told apart by how
+        # many of it come before it
+        seen = {}
+        keys = []
+        for card in hand:
+            keys.append((card, seen.get(card, 0)))
+            seen[card] = keys[-1][1] + 1
+        in_hand = set(keys)
+        
+        kept = {}
+        for key, card_button in self.card_buttons:
+            if key in in_hand:
+                kept[key] = card_button
+            else:
+                card_button.pack_forget()
+                self.card_button_pool.append(card_button)
+        
+        # Cards are normally only removed or appended, so the kept buttons
+        # are still the first ones, in hand order, and new ones go after them;
+        # repack everything if they are not.
+        if keys[:len(kept)] != list(kept):
+            for card_button in kept.values():
+                card_button.pack_forget()
+            repack = True
+        else:
+            repack = False
+        
+        card_buttons = []
+        for key in keys:
+            card_button = kept.get(key)
+            if card_button is None:
+                card_button = self.take_card_button(key[0])
+                card_button.pack(side=tk.LEFT, padx=5)
+            elif repack:
+                card_button.pack(side=tk.LEFT, padx=5)
+            card_buttons.append((key, card_button))
+        self.card_buttons = card_buttons
+        
+        can_play = self.turn == 0 and not self.waiting_for_color_choice and not self.game_over
+        for (card, _), card_button in card_buttons:
+            playable = can_play and self.is_card_playable(card)
+            self.configure(card_button, state=tk.NORMAL if playable else tk.DISABLED)
+
+    def play_hand_card(self, card):
+        for idx, hand_card in enumerate(self.player.hand):
+            if hand_card is card:
+                self.play_card(idx)
+                return
 
     def update_ui(self):
-        for widget in self.hand_frame.winfo_children():
-            widget.destroy()
+        self.update_hand()
         
         card_text = self.format_card_text(self.top_card)
-        self.top_card_label.config(text=card_text, bg=self.get_card_color(self.top_card), 
-                                  fg=self.get_text_color(self.top_card))
+        self.configure(self.top_card_label, text=card_text, bg=self.get_card_color(self.top_card),
+                       fg=self.get_text_color(self.top_card))
         
         color_map = {
             "Red": "#FF6B6B",
@@ -152,54 +253,43 @@ class UNOGame:
             "Blue": "#779ECB",
             "Yellow": "#FDFD96"
         }
-        self.color_indicator.config(text=self.current_color, bg=color_map.get(self.current_color, "#FFFFFF"),
-                                   fg="black" if self.current_color in ["Yellow", "Green"] else "white")
-        
-        self.bot_label.config(text=f"Bot's Cards: {len(self.bot.hand)}")
-        self.deck_label.config(text=f"Deck: {len(self.deck)}")
-        self.turn_label.config(text=f"{'Your Turn' if self.turn == 0 else 'Bot\'s Turn'}")
-        
-        for idx, card in enumerate(self.player.hand):
-            card_button = tk.Button(self.hand_frame, text=self.format_card_text(card), 
-                                   font=("Arial", 12), width=8, height=4,
-                                   bg=self.get_card_color(card), fg=self.get_text_color(card),
-                                   command=lambda idx=idx: self.play_card(idx))
-            
-            if not self.is_card_playable(card) or self.turn != 0 or self.waiting_for_color_choice:
-                card_button.config(state=tk.DISABLED)
-                
-            card_button.pack(side=tk.LEFT, padx=5)
+        self.configure(self.color_indicator, text=self.current_color, bg=color_map.get(self.current_color, "#FFFFFF"),
+                       fg="black" if self.current_color in ["Yellow", "Green"] else "white")
+        
+        self.configure(self.bot_label, text=f"Bot's Cards: {len(self.bot.hand)}")
+        self.configure(self.deck_label, text=f"Deck: {len(self.deck)}")
+        self.configure(self.turn_label, text="Your Turn" if self.turn == 0 else "Bot's Turn")
+        
+        if self.waiting_for_color_choice != self.color_selection_shown:
+            if self.waiting_for_color_choice:
+                self.color_selection_frame.pack(pady=10)
+            else:
+                self.color_selection_frame.pack_forget()
+            self.color_selection_shown = self.waiting_for_color_choice
         
         if self.waiting_for_color_choice:
-            self.color_selection_frame.pack(pady=10)
-            self.draw_button.config(state=tk.DISABLED)
+            self.configure(self.draw_button, state=tk.DISABLED)
         else:
-            self.color_selection_frame.pack_forget()
-            self.draw_button.config(state=tk.NORMAL if self.turn == 0 and not self.game_over else tk.DISABLED)
+            self.configure(self.draw_button, state=tk.NORMAL if self.turn == 0 and not self.game_over else tk.DISABLED)
         
-        self.uno_button.config(state=tk.NORMAL if len(self.player.hand) == 2 and self.turn == 0 else tk.DISABLED)
+        self.configure(self.uno_button, state=tk.NORMAL if len(self.player.hand) == 2 and self.turn == 0 else tk.DISABLED)
 
     def draw_card(self):
         if self.turn != 0 or self.game_over or self.waiting_for_color_choice:
             return
         
-        if not self.deck:
-            self.reshuffle_discard_pile()
-            if not self.deck:
-                messagebox.showinfo("Game Info", "No cards left in the deck. The game is a draw.")
-                self.game_over = True
-                return
+        reshuffles = self.state.reshuffles
+        self.engine.apply(DRAW_MOVE)
         
-        self.player.draw_card(self.deck)
-        self.message_label.config(text="You drew a card.")
+        if self.game_over:
+            messagebox.showinfo("Game Info", "No cards left in the deck. The game is a draw.")
+            return
         
-        drawn_card = self.player.hand[-1]
-        if self.is_card_playable(drawn_card):
-            self.update_ui()
-        else:
-            self.turn = 1
-            self.update_ui()
-            self.root.after(1000, self.bot_turn)
+        self.show_message("You drew a card.", reshuffles)
+        self.update_ui()
+        
+        if self.turn == 1:
+            self.start_bot_turn()
 
     def play_card(self, card_idx):
         if self.turn != 0 or self.game_over or self.waiting_for_color_choice:
@@ -211,232 +301,127 @@ class UNOGame:
             self.message_label.config(text="You cannot play that card.")
             return
         
-        self.player.play_card(card_idx)
-        self.discard_pile.append(self.top_card)
-        self.top_card = chosen_card
+        reshuffles = self.state.reshuffles
+        self.engine.apply(Move(PLAY, chosen_card, None))
         
-        if chosen_card.is_wild() or chosen_card.is_plus_four():
-            self.waiting_for_color_choice = True
-            self.message_label.config(text="Choose a color:")
+        if self.game_over:
+            messagebox.showinfo("Game Over", "You win!")
             self.update_ui()
             return
         
-        self.current_color = chosen_card.color
-        self.message_label.config(text=f"You played {chosen_card}")
-        
-        if not self.player.hand:
-            messagebox.showinfo("Game Over", "You win!")
-            self.game_over = True
+        if self.waiting_for_color_choice:
+            self.message_label.config(text="Choose a color:")
+            self.update_ui()
             return
         
         if chosen_card.is_skip():
-            self.message_label.config(text="Skip card played! Bot's turn is skipped.")
-            self.turn = 0
+            self.show_message("Skip card played! Bot's turn is skipped.", reshuffles)
         elif chosen_card.is_reverse():
-            self.message_label.config(text="Reverse card played! (No effect in 2-player game)")
-            self.turn = 0
+            self.show_message("Reverse card played! (No effect in 2-player game)", reshuffles)
         elif chosen_card.is_plus_two():
-            self.message_label.config(text="+2 card played! Bot draws two cards.")
-            for _ in range(2):
-                if not self.deck:
-                    self.reshuffle_discard_pile()
-                    if not self.deck:
-                        break
-                self.bot.draw_card(self.deck)
-            self.turn = 0
+            self.show_message("+2 card played! Bot draws two cards.", reshuffles)
         else:
-            self.turn = 1
+            self.show_message(f"You played {chosen_card}", reshuffles)
         
         self.update_ui()
         
         if self.turn == 1:
-            self.root.after(1000, self.bot_turn)
+            self.start_bot_turn()
 
     def select_color(self, color):
-        self.current_color = color
-        self.waiting_for_color_choice = False
+        if not self.waiting_for_color_choice or self.turn != 0:
+            return
         
-        self.message_label.config(text=f"You chose {color} color.")
+        reshuffles = self.state.reshuffles
+        self.engine.apply(Move(COLOR, None, color))
         
         if self.top_card.is_plus_four():
-            self.message_label.config(text=f"Wild +4 played! Bot draws four cards.")
-            for _ in range(4):
-                if not self.deck:
-                    self.reshuffle_discard_pile()
-                    if not self.deck:
-                        break
-                self.bot.draw_card(self.deck)
-        
-        self.turn = 1
+            self.show_message("Wild +4 played! Bot draws four cards.", reshuffles)
+        else:
+            self.show_message(f"You chose {color} color.", reshuffles)
+        
         self.update_ui()
         
-        self.root.after(1000, self.bot_turn)
+        if self.turn == 1:
+            self.start_bot_turn()
+
+    def start_bot_turn(self):
+        """Let the bot think on the worker thread; bot_turn gets its move."""
+        state = self.state
+        table = self.search_table
+        budget = SearchBudget(BOT_THINK_MS)
+        self.thinker.think(lambda: bot_move(state, table=table, budget=budget), self.bot_turn,
+                           BOT_DELAY_MS, budget, self.bot_failed)
+
+    def bot_failed(self, error):
+        """The bot's search raised: report it and play the first legal move so the game goes on."""
+        traceback.print_exception(error)
+        if self.turn != 1 or self.game_over:
+            return
+        self.bot_turn(self.engine.legal_moves()[0])
 
-    def bot_turn(self):
+    def bot_turn(self, move):
         if self.turn != 1 or self.game_over:
             return
         
-        card_to_play = get_best_move(self.bot.hand, self.top_card, self.current_color)
+        if move.kind == PLAY:
+            self.bot_play(move.card)
+            return
         
-        if card_to_play:
-            self.bot.hand.remove(card_to_play)
-            self.discard_pile.append(self.top_card)
-            self.top_card = card_to_play
-            
-            if card_to_play.is_wild() or card_to_play.is_plus_four():
-                chosen_color = choose_color(self.bot.hand)
-                self.current_color = chosen_color
-                self.message_label.config(text=f"Bot played {card_to_play} and chose {chosen_color} color.")
-                
-                if card_to_play.is_plus_four():
-                    self.message_label.config(text=f"Bot played Wild +4 and chose {chosen_color}! You draw four cards.")
-                    for _ in range(4):
-                        if not self.deck:
-                            self.reshuffle_discard_pile()
-                            if not self.deck:
-                                break
-                        self.player.draw_card(self.deck)
-            else:
-                self.current_color = card_to_play.color
-                self.message_label.config(text=f"Bot played {card_to_play}")
-            
-            if not self.bot.hand:
-                messagebox.showinfo("Game Over", "Bot wins!")
-                self.game_over = True
-                self.update_ui()
-                return
-            
-            if card_to_play.is_skip():
-                self.message_label.config(text="Bot played Skip! Your turn is skipped.")
-                self.turn = 1
-                self.update_ui()
-                self.root.after(1000, self.bot_turn)
-                return
-            elif card_to_play.is_reverse():
-                self.message_label.config(text="Bot played Reverse! (No effect in 2-player game)")
-                self.turn = 1
-                self.update_ui()
-                self.root.after(1000, self.bot_turn)
-                return
-            elif card_to_play.is_plus_two():
-                self.message_label.config(text="Bot played +2! You draw two cards.")
-                for _ in range(2):
-                    if not self.deck:
-                        self.reshuffle_discard_pile()
-                        if not self.deck:
-                            break
-                    self.player.draw_card(self.deck)
-                self.turn = 1
-                self.update_ui()
-                self.root.after(1000, self.bot_turn)
-                return
-            else:
-                self.turn = 0
-        else:
-            if not self.deck:
-                self.reshuffle_discard_pile()
-                if not self.deck:
-                    messagebox.showinfo("Game Info", "No cards left in the deck. The game is a draw.")
-                    self.game_over = True
-                    self.update_ui()
-                    return
-            
-            self.bot.draw_card(self.deck)
-            self.message_label.config(text="Bot drew a card.")
-            
-            drawn_card = self.bot.hand[-1]
-            if self.is_card_playable(drawn_card):
-                self.update_ui()
-                self.root.after(1000, lambda: self.bot_play_after_draw(drawn_card))
-                return
-            
-            self.turn = 0
+        reshuffles = self.state.reshuffles
+        self.engine.apply(move)
         
+        if self.game_over:
+            messagebox.showinfo("Game Info", "No cards left in the deck. The game is a draw.")
+            self.update_ui()
+            return
+        
+        self.show_message("Bot drew a card.", reshuffles)
         self.update_ui()
+        
+        if self.state.drawn_card is not None:
+            self.thinker.wait(self.bot_play_after_draw, BOT_DELAY_MS)
 
-    def is_card_playable(self, card):
-        if card.is_wild() or card.is_plus_four():
-            return True
-            
-        if card.color == self.current_color:
-            return True
-            
-        if card.value == self.top_card.value:
-            return True
-            
-        return False
-
-    def bot_play_after_draw(self, card):
-        if self.game_over:
+    def bot_play_after_draw(self):
+        if self.game_over or self.turn != 1 or self.state.drawn_card is None:
             return
-            
-        self.bot.hand.remove(card)
-        self.discard_pile.append(self.top_card)
-        self.top_card = card
-        
-        if card.is_wild() or card.is_plus_four():
-            chosen_color = choose_color(self.bot.hand)
-            self.current_color = chosen_color
-            self.message_label.config(text=f"Bot played {card} after drawing and chose {chosen_color} color.")
-            
-            if card.is_plus_four():
-                self.message_label.config(text=f"Bot played Wild +4 after drawing and chose {chosen_color}! You draw four cards.")
-                for _ in range(4):
-                    if not self.deck:
-                        self.reshuffle_discard_pile()
-                        if not self.deck:
-                            break
-                    self.player.draw_card(self.deck)
-        else:
-            self.current_color = card.color
-            self.message_label.config(text=f"Bot played {card} after drawing.")
         
-        if not self.bot.hand:
+        self.bot_play(self.state.drawn_card, " after drawing")
+
+    def bot_play(self, card, when=""):
+        reshuffles = self.state.reshuffles
+        self.engine.apply(Move(PLAY, card, None))
+        
+        if self.game_over:
             messagebox.showinfo("Game Over", "Bot wins!")
-            self.game_over = True
             self.update_ui()
             return
         
-        if card.is_skip():
-            self.message_label.config(text="Bot played Skip after drawing! Your turn is skipped.")
-            self.turn = 1
-            self.update_ui()
-            self.root.after(1000, self.bot_turn)
-            return
+        if self.waiting_for_color_choice:
+            self.engine.apply(bot_move(self.state))
+            chosen_color = self.current_color
+            if card.is_plus_four():
+                self.show_message(f"Bot played Wild +4{when} and chose {chosen_color}! You draw four cards.", reshuffles)
+            else:
+                self.show_message(f"Bot played {card}{when} and chose {chosen_color} color.", reshuffles)
+        elif card.is_skip():
+            self.show_message(f"Bot played Skip{when}! Your turn is skipped.", reshuffles)
         elif card.is_reverse():
-            self.message_label.config(text="Bot played Reverse after drawing! (No effect in 2-player game)")
-            self.turn = 1
-            self.update_ui()
-            self.root.after(1000, self.bot_turn)
-            return
+            self.show_message(f"Bot played Reverse{when}! (No effect in 2-player game)", reshuffles)
         elif card.is_plus_two():
-            self.message_label.config(text="Bot played +2 after drawing! You draw two cards.")
-            for _ in range(2):
-                if not self.deck:
-                    self.reshuffle_discard_pile()
-                    if not self.deck:
-                        break
-                self.player.draw_card(self.deck)
-            self.turn = 1
-            self.update_ui()
-            self.root.after(1000, self.bot_turn)
-            return
+            self.show_message(f"Bot played +2{when}! You draw two cards.", reshuffles)
         else:
-            self.turn = 0
+            self.show_message(f"Bot played {card}{when}.", reshuffles)
         
         self.update_ui()
-
-    def reshuffle_discard_pile(self):
-        if not self.discard_pile:
-            return
-            
-        top_card = self.discard_pile.pop()
-        
-        self.deck = self.discard_pile
-        random.shuffle(self.deck)
-        self.discard_pile = [top_card]
         
-        self.message_label.config(text="Deck was empty. Reshuffled discard pile.")
+        if self.turn == 1:
+            self.start_bot_turn()
+
+    def show_message(self, text, reshuffles):
+        if self.state.reshuffles != reshuffles:
+            text += " Deck was empty. Reshuffled discard pile."
+        self.message_label.config(text=text)
 
     def say_uno(self):
         if len(self.player.hand) == 2 and self.turn == 0:
@@ -449,6 +434,11 @@ class UNOGame:
         self.reset_game()
         self.update_ui()
 
+    def close(self):
+        self.thinker.shutdown()
+        self.event_log.close()
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
     game = UNOGame(root)
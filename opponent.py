@@ -0,0 +1,215 @@
+import itertools
+from functools import partial
+
+from cardcodes import (NUM_KINDS, KIND_COLOR, KIND_VALUE, PLAYABLE, IS_PLUS_TWO, IS_PLUS_FOUR,
+                       COLOR_IDS, color_id, kind_of)
+from deck import CARDS
+from engine import PLAY, DRAW, COLOR, PENALTY, RESHUFFLE, bot_move
+
+# Copies of each kind in a full deck
+KIND_TOTALS = [0] * NUM_KINDS
+for card in CARDS:
+    KIND_TOTALS[kind_of(card)] += 1
+# The kinds of each color id
+COLOR_KINDS = [[kind for kind in range(NUM_KINDS) if KIND_COLOR[kind] == color] for color in range(len(COLOR_IDS))]
+
+# How much likelier a player is to draw with no playable card than with one;
+# players may hold a card back, so a draw is strong evidence but not proof
+DRAW_EVIDENCE = 10.0
+# How much likelier a player is to name a color they hold cards of
+COLOR_EVIDENCE = 2.0
+
+# Every change to a model gets a new token, so that search results cached
+# under one belief are never read back under another
+TOKENS = itertools.count()
+
+
+class OpponentModel:
+    """What one player (the observer) believes about the other's hand.
+
+    held[kind] is the expected number of cards of that kind in the
+    opponent's hand and unseen[kind] the number of copies the observer has
+    not seen, in the opponent's hand or the draw pile. Feed the model the
+    engine's events, as its listener, and each one updates it in time that
+    does not depend on how long the game has run: cards the observer draws
+    or sees played leave unseen, a draw on a top card makes the cards that
+    could have been played unlikely, a color choice makes that color likelier,
+    and a reshuffle returns the discards but the latest to unseen.
+    """
+
+    def __init__(self, state, observer):
+        """Start from what the observer can see of state."""
+        self.observer = observer
+        self.unseen = list(KIND_TOTALS)
+        for card in state.players[observer].hand:
+            self.unseen[kind_of(card)] -= 1
+        self.discarded = [0] * NUM_KINDS
+        # A reshuffle leaves the latest discard behind
+        self.latest_discard = None
+        for card in state.deck.discards():
+            self.latest_discard = kind_of(card)
+            self.discarded[self.latest_discard] += 1
+            self.unseen[self.latest_discard] -= 1
+        self.top_kind = kind_of(state.top_card)
+        self.unseen[self.top_kind] -= 1
+        self.color = color_id(state.current_color)
+
+        self.cards = len(state.players[1 - observer].hand)
+        total = sum(self.unseen)
+        self.held = [self.cards * unseen / total for unseen in self.unseen]
+        self.changed()
+
+    def changed(self):
+        self.token = next(TOKENS)
+        # chance_weights by (top value, active color), for this token
+        self.weights = {}
+
+    def __call__(self, event, player, value):
+        if event == PLAY:
+            kind = kind_of(value)
+            if player != self.observer:
+                # Taking each card in hand to be drawn independently, the
+                # cards left look like the ones before, one fewer
+                self.unseen[kind] -= 1
+                self.cards -= 1
+                self.normalize()
+            self.discarded[self.top_kind] += 1
+            self.latest_discard = self.top_kind
+            self.top_kind = kind
+            self.color = KIND_COLOR[kind]
+        elif event == COLOR:
+            self.color = COLOR_IDS[value]
+            if player != self.observer:
+                self.weigh(COLOR_KINDS[self.color], COLOR_EVIDENCE)
+        elif event in (DRAW, PENALTY):
+            if value is None:
+                return
+            if player == self.observer:
+                kind = kind_of(value)
+                self.unseen[kind] -= 1
+                if self.held[kind] > self.unseen[kind]:
+                    self.normalize()
+            else:
+                if event == DRAW:
+                    self.weigh(PLAYABLE[self.color][KIND_VALUE[self.top_kind]], 1 / DRAW_EVIDENCE)
+                self.draw_unseen()
+        elif event == RESHUFFLE:
+            self.discarded[self.latest_discard] -= 1
+            for kind, count in enumerate(self.discarded):
+                self.unseen[kind] += count
+            self.discarded = [0] * NUM_KINDS
+            self.discarded[self.latest_discard] = 1
+        else:
+            return
+        self.changed()
+
+    def weigh(self, kinds, evidence):
+        """Bayes update for an observation evidence times as likely for each card of one of kinds."""
+        held = self.held
+        for kind in kinds:
+            held[kind] *= evidence
+        self.normalize()
+
+    def draw_unseen(self):
+        """The opponent drew a card the observer did not see."""
+        held = self.held
+        in_pile = [unseen - count for unseen, count in zip(self.unseen, held)]
+        total = sum(in_pile)
+        if total > 0:
+            self.held = [count + left / total for count, left in zip(held, in_pile)]
+        self.cards += 1
+        self.normalize()
+
+    def normalize(self):
+        """Scale held to add up to the opponent's hand size, no kind above its unseen copies."""
+        unseen = self.unseen
+        total = sum(self.held)
+        if not total:
+            # Nothing is believed any more: start over from the unseen cards
+            self.held = [float(count) for count in unseen]
+            total = sum(unseen)
+        scale = self.cards / total if total else 0.0
+        held = self.held = [min(count * scale, most) for count, most in zip(self.held, unseen)]
+        # Capping a kind at its unseen copies leaves cards to spread over the
+        # others; a few passes leave too little over to matter to a search
+        for _ in range(4):
+            missing = self.cards - sum(held)
+            if missing < 1e-9:
+                break
+            open_kinds = [kind for kind in range(NUM_KINDS) if held[kind] < unseen[kind]]
+            if not open_kinds:
+                break
+            base = sum(held[kind] for kind in open_kinds)
+            for kind in open_kinds:
+                share = held[kind] / base if base else 1 / len(open_kinds)
+                held[kind] = min(held[kind] + missing * share, unseen[kind])
+
+    def chance_weights(self, played_kind, color):
+        """Return (play, penalty, draw): how likely the opponent is to answer a card with each.
+
+        play is any card but a +2 or +4, penalty one of those, and draw having
+        nothing that can go on played_kind while color is active. These take
+        the place of expectimax's fixed CHANCE_WEIGHTS.
+        """
+        key = (KIND_VALUE[played_kind], color)
+        weights = self.weights.get(key)
+        if weights is None:
+            if not self.cards:
+                weights = (0.0, 0.0, 1.0)
+            else:
+                playable = PLAYABLE[color][key[0]]
+                can_play = min(sum(self.held[kind] for kind in playable) / self.cards, 1.0)
+                penalties = sum(self.held[kind] for kind in playable if IS_PLUS_TWO[kind] or IS_PLUS_FOUR[kind])
+                draw = (1 - can_play) ** self.cards
+                penalty = (1 - draw) * penalties / (can_play * self.cards) if can_play else 0.0
+                weights = (1 - draw - penalty, penalty, draw)
+            self.weights[key] = weights
+        return weights
+
+    def card_weight(self, card):
+        """How likely one unseen copy of card is to be in the opponent's hand rather than the draw pile."""
+        kind = kind_of(card)
+        if not self.unseen[kind]:
+            return 0.0
+        return self.held[kind] / self.unseen[kind]
+
+
+def track(engine, observer):
+    """Return an OpponentModel for observer that follows engine's game from now on."""
+    model = OpponentModel(engine.state, observer)
+    listener = engine.listener
+    if listener is None:
+        engine.listener = model
+    else:
+        def both(event, player, value):
+            listener(event, player, value)
+            model(event, player, value)
+        engine.listener = both
+    return model
+
+
+def bind(policy, engine, seat, endgame=None):
+    """Return policy ready to play seat in engine's game, as policy(state, rng).
+
+    A policy that tracks its opponent gets a model of seat's opponent that
+    follows the game from now on, and one that uses an endgame table gets
+    endgame if it is given; any other policy is returned as it is.
+    """
+    keywords = {}
+    if getattr(policy, "tracks_opponent", False):
+        keywords["opponent"] = track(engine, seat)
+    if endgame is not None and getattr(policy, "uses_endgame", False):
+        keywords["endgame"] = endgame
+    if keywords:
+        return partial(policy, **keywords)
+    return policy
+
+
+def bayes_move(state, rng=None, opponent=None, endgame=None):
+    """Play like best, with expectimax weighing the opponent's replies by an OpponentModel."""
+    return bot_move(state, rng, opponent=opponent, endgame=endgame)
+
+
+# Hosts that see this give the strategy a model: policy(state, rng, opponent=model)
+bayes_move.tracks_opponent = True
+bayes_move.uses_endgame = True
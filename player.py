@@ -3,23 +3,74 @@ class Player:
         self.name = name
         self.hand = []
 
+    @property
+    def hand(self):
+        """The cards in hand, in the order they were drawn.
+
+        Add and remove cards through the Player so that its index stays in
+        step; assigning a whole new hand is fine.
+        """
+        return self._hand
+
+    @hand.setter
+    def hand(self, cards):
+        self._hand = []
+        # The cards in hand by color and by value, each in hand order
+        self.by_color = {}
+        self.by_value = {}
+        for card in cards:
+            self.add_card(card)
+
+    def copy(self):
+        """Return a Player holding the same cards in a hand of its own."""
+        player = Player.__new__(Player)
+        player.name = self.name
+        player._hand = list(self._hand)
+        player.by_color = {color: list(cards) for color, cards in self.by_color.items()}
+        player.by_value = {value: list(cards) for value, cards in self.by_value.items()}
+        return player
+
+    def add_card(self, card):
+        self._hand.append(card)
+        self.by_color.setdefault(card.color, []).append(card)
+        self.by_value.setdefault(card.value, []).append(card)
+
+    def remove_card(self, card):
+        self._hand.remove(card)
+        self.by_color[card.color].remove(card)
+        self.by_value[card.value].remove(card)
+
     def draw_card(self, deck):
         """Draw a card from the deck and add it to the player's hand."""
         if deck:
-            self.hand.append(deck.pop())
+            self.add_card(deck.pop())
             return True
         return False
 
-    def has_playable_card(self, top_card):
+    def has_playable_card(self, top_card, current_color=None):
         """Check if player has a playable card."""
-        return any(card.matches(top_card) for card in self.hand)
-    
-    def get_playable_cards(self, top_card):
-        """Return a list of playable cards."""
-        return [card for card in self.hand if card.matches(top_card)]
-    
+        return bool(self.get_playable_cards(top_card, current_color))
+
+    def get_playable_cards(self, top_card, current_color=None):
+        """Return a list of playable cards; current_color defaults to the top card's.
+
+        Gives the cards is_playable accepts, looking only at the cards of the
+        active color, of the top card's value and the wild cards, in that order.
+        """
+        if current_color is None:
+            current_color = top_card.color
+        cards = list(self.by_color.get(current_color, ()))
+        for card in self.by_value.get(top_card.value, ()):
+            if card.color != current_color and card.color != "Wild":
+                cards.append(card)
+        if current_color != "Wild":
+            cards.extend(self.by_color.get("Wild", ()))
+        return cards
+
     def play_card(self, card_index):
         """Play a card from player's hand by index."""
         if 0 <= card_index < len(self.hand):
-            return self.hand.pop(card_index)
-        return None
\ No newline at end of file
+            card = self.hand[card_index]
+            self.remove_card(card)
+            return card
+        return None
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+from cardcodes import kind_of, find_card
+from endgame import endgame_table
+from engine import Engine, Move, PLAY, DRAW, COLOR, RESHUFFLE, DRAW_MOVE, BOT
+from eventlog import encode_event, decode_events, read_games, cards_of
+from ismcts import move_key
+from opponent import bind
+from strategies import STRATEGIES
+
+
+class ReplayEngine(Engine):
+    """Engine whose reshuffles put the deck into the orders recorded in a log."""
+
+    def __init__(self, deck, orders, listener=None):
+        self.orders = iter(orders)
+        super().__init__(deck=deck, listener=listener)
+
+    def shuffle(self, deck):
+        by_kind = defaultdict(list)
+        while deck:
+            card = deck.pop()
+            by_kind[kind_of(card)].append(card)
+        deck.put_back([by_kind[kind].pop() for kind in next(self.orders)])
+
+
+def logged_move(state, event, value):
+    if event == PLAY:
+        card = find_card(state.current_player.hand, value)
+        if card is None:
+            raise ValueError("logged card is not in the player's hand")
+        return Move(PLAY, card, None)
+    if event == COLOR:
+        return Move(COLOR, None, value)
+    return DRAW_MOVE
+
+
+def replay_game(events, policy=None, rng=None, endgame=None):
+    """Replay the events of one logged game; return its Engine and the decision counts.
+
+    Only the moves are replayed; forced draws and reshuffles follow from the
+    rules and are checked against the log, raising ValueError on a mismatch.
+    With a policy(state, rng), every bot move is also compared with what the
+    policy picks, and (decisions, agreements) counts how often they matched.
+    A policy that can use an endgame table is given endgame, if any.
+    """
+    orders = [value for event, _, value in events if event == RESHUFFLE]
+    replayed = bytearray()
+
+    def record(event, player, value):
+        replayed.extend(encode_event(event, player, value))
+
+    engine = ReplayEngine(cards_of(events[0][2]), orders, record)
+    state = engine.state
+    if policy is not None:
+        policy = bind(policy, engine, BOT, endgame)
+    decisions = agreements = 0
+    for event, player, value in events:
+        if event not in (PLAY, DRAW, COLOR):
+            continue
+        if player != state.turn or state.game_over:
+            raise ValueError("logged move is out of turn")
+        move = logged_move(state, event, value)
+        if policy is not None and player == BOT:
+            decisions += 1
+            if move_key(policy(state, rng)) == move_key(move):
+                agreements += 1
+        engine.apply(move)
+
+    if list(decode_events(replayed)) != events:
+        raise ValueError("replay does not match the log")
+    return engine, decisions, agreements
+
+
+def replay_log(path, policy=None, seed=0, endgame_path=None):
+    """Replay every game in the log at path and summarize the run.
+
+    The policy plays small hands from the endgame table at endgame_path only
+    when it is given.
+    """
+    endgame = endgame_table(endgame_path) if endgame_path is not None else None
+    rng = random.Random(seed)
+    games = events = decisions = agreements = 0
+    start = time.perf_counter()
+    for game in read_games(path):
+        _, game_decisions, game_agreements = replay_game(game, policy, rng, endgame)
+        games += 1
+        events += len(game)
+        decisions += game_decisions
+        agreements += game_agreements
+    seconds = time.perf_counter() - start
+
+    report = {
+        "games": games,
+        "events": events,
+        "seconds": seconds,
+        "events_per_sec": events / seconds if seconds else 0.0,
+    }
+    if policy is not None:
+        report["decisions"] = decisions
+        report["agreements"] = agreements
+        report["agreement_rate"] = agreements / decisions if decisions else 0.0
+        report["endgame"] = endgame_path
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a game-event log headless.")
+    parser.add_argument("log")
+    parser.add_argument("-c", "--check", choices=sorted(STRATEGIES),
+                        help="compare the bot's logged moves with this strategy's choices")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-e", "--endgame", metavar="PATH",
+                        help="let the checked strategy play small hands from this endgame table")
+    args = parser.parse_args(argv)
+    if args.endgame is not None and not os.path.isfile(args.endgame):
+        parser.error(f"No endgame table at {args.endgame}; run endgame.py to make one.")
+
+    policy = STRATEGIES[args.check] if args.check else None
+    json.dump(replay_log(args.log, policy, args.seed, args.endgame), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
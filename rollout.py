@@ -0,0 +1,275 @@
+import random
+
+import numpy as np
+
+from ai import get_best_move
+from batcheval import COLOR_MEMBERSHIP, evaluate_batch
+from cardcodes import (encode_hand, kind_of, color_id, find_card, NUM_KINDS, NO_COLOR, KIND_COLOR, KIND_VALUE,
+                       PLAYABLE, IS_WILD, IS_SKIP, IS_REVERSE, IS_PLUS_TWO, IS_PLUS_FOUR, EVALUATE_WEIGHTS)
+from deck import CARDS
+from strategies import search_move
+
+# Rollouts per playable card unless told otherwise
+ROLLOUTS = 256
+# Rollouts still running after this many plies go to the player whose hand
+# evaluate_hand scores higher
+ROLLOUT_PLIES = 1000
+
+# The kind of every card in a full deck
+DECK_KINDS = np.array([kind_of(card) for card in CARDS], dtype=np.int8)
+KIND_VALUES = np.array(KIND_VALUE, dtype=np.int64)
+KIND_COLORS = np.array(KIND_COLOR, dtype=np.int64)
+# ALLOWED[color, value, kind] is True when kind can go on a top card with
+# that value while that color is active
+ALLOWED = np.zeros((len(PLAYABLE), len(PLAYABLE[0]), NUM_KINDS), dtype=bool)
+for active_color, by_value in enumerate(PLAYABLE):
+    for top_value, kinds in enumerate(by_value):
+        ALLOWED[active_color, top_value, list(kinds)] = True
+# Kinds that have the player who played them move again, as in engine.resolve_card
+AGAIN = np.array([skip or reverse or plus_two for skip, reverse, plus_two in zip(IS_SKIP, IS_REVERSE, IS_PLUS_TWO)],
+                 dtype=bool)
+# Cards the opponent draws when a kind is played
+PENALTIES = np.array([2 * plus_two + 4 * plus_four for plus_two, plus_four in zip(IS_PLUS_TWO, IS_PLUS_FOUR)])
+WILDS = np.array(IS_WILD, dtype=bool)
+# The greedy policy plays the card whose play raises evaluate_hand most, so
+# numbers go first and wilds are kept for last
+GREEDY_PRIORITY = -np.array(EVALUATE_WEIGHTS, dtype=np.float64)
+
+
+class Rollouts:
+    """Many playouts from one position, advanced together one ply per step.
+
+    Each row is one game between player 0, who is to move in the position,
+    and player 1. Hands are count vectors in a 2 x rows x NUM_KINDS array.
+    Each row's draw pile holds kinds in pile[row, ptr:end], and its discard
+    pile is a count vector with the latest discard kept apart, as the engine
+    keeps it out of a reshuffle. The rules are the engine's: Skip and Reverse
+    give another turn, a +2 makes the opponent draw two and gives another
+    turn, a +4 makes them draw four, a card drawn that can be played is
+    played at once, and the discards are shuffled back in when the draw pile
+    runs out.
+
+    Both players follow the same policy: greedy plays the card that helps the
+    hand most and names its most common color; otherwise cards and colors are
+    picked at random.
+    """
+
+    def __init__(self, hand, top_kind, color, unseen, opponent_cards, count, rng, greedy=True, discarded=()):
+        """Deal count games: opponent_cards of the unseen kinds to player 1, the rest to the draw pile.
+
+        discarded holds the kinds already in the discard pile, latest last.
+        """
+        self.rng = rng
+        self.greedy = greedy
+        self.count = count
+        self.hands = np.zeros((2, count, NUM_KINDS), dtype=np.int16)
+        self.hands[0] = hand
+        self.sizes = np.zeros((2, count), dtype=np.int64)
+        self.sizes[0] = hand.sum()
+        self.sizes[1] = opponent_cards
+
+        dealt = unseen[np.argsort(rng.random((count, len(unseen))), axis=1)]
+        rows = np.repeat(np.arange(count), opponent_cards)
+        np.add.at(self.hands[1], (rows, dealt[:, :opponent_cards].ravel()), 1)
+        self.pile = np.zeros((count, len(CARDS)), dtype=np.int8)
+        self.pile[:, :len(unseen) - opponent_cards] = dealt[:, opponent_cards:]
+        self.ptr = np.zeros(count, dtype=np.int64)
+        self.end = np.full(count, len(unseen) - opponent_cards, dtype=np.int64)
+        self.discards = np.zeros((count, NUM_KINDS), dtype=np.int16)
+        self.discards[:] = np.bincount(np.array(discarded, dtype=np.int64), minlength=NUM_KINDS)
+        self.latest = np.full(count, discarded[-1] if len(discarded) else -1, dtype=np.int64)
+
+        self.top = np.full(count, top_kind, dtype=np.int64)
+        self.color = np.full(count, color, dtype=np.int64)
+        self.turn = np.zeros(count, dtype=np.int64)
+        self.winner = np.full(count, -1, dtype=np.int64)
+        self.active = np.ones(count, dtype=bool)
+
+    def run(self, first_kinds=None, plies=ROLLOUT_PLIES):
+        """Play every game out, player 0 starting with first_kinds if given; return the winners (-1: draw).
+
+        Games still running after plies moves are judged by their hands.
+        """
+        self.step(first_kinds)
+        for _ in range(plies - 1):
+            if not self.active.any():
+                break
+            self.step()
+        self.judge()
+        return self.winner
+
+    def judge(self):
+        """End the running games: the hand evaluate_hand scores higher wins, equal hands draw."""
+        rows = np.flatnonzero(self.active)
+        if not len(rows):
+            return
+        # Both players' hands of every game scored in one batch
+        scores = evaluate_batch(self.hands[:, rows].reshape(-1, NUM_KINDS)).reshape(2, len(rows))
+        self.winner[rows] = np.where(scores[0] > scores[1], 0, np.where(scores[1] > scores[0], 1, -1))
+        self.active[rows] = False
+
+    def step(self, kinds=None):
+        """Play one move in every running game: kinds, if given, or the policy's pick."""
+        rows = np.flatnonzero(self.active)
+        players = self.turn[rows]
+        allowed = ALLOWED[self.color[rows], KIND_VALUES[self.top[rows]]]
+        if kinds is None:
+            kinds = self.pick(self.hands[players, rows], allowed)
+        else:
+            kinds = np.array(kinds[rows], dtype=np.int64)
+
+        # Nothing to play: draw, and play the card drawn if it can go
+        stuck = np.flatnonzero(kinds < 0)
+        if len(stuck):
+            drawn = self.draw(rows[stuck], players[stuck])
+            self.active[rows[stuck[drawn < 0]]] = False
+            playable = (drawn >= 0) & allowed[stuck, np.maximum(drawn, 0)]
+            kinds[stuck] = np.where(playable, drawn, -1)
+            passing = stuck[(drawn >= 0) & ~playable]
+            self.turn[rows[passing]] = 1 - players[passing]
+
+        moving = kinds >= 0
+        self.play(rows[moving], players[moving], kinds[moving])
+
+    def pick(self, hands, allowed):
+        """The kind each hand plays, or -1 where none can be played."""
+        playable = (hands > 0) & allowed
+        if self.greedy:
+            keys = GREEDY_PRIORITY + self.rng.random(hands.shape)
+        else:
+            # Any card in hand as likely as any other, so kinds weigh by count
+            keys = self.rng.random(hands.shape) ** (1 / np.maximum(hands, 1))
+        kinds = np.where(playable, keys, -np.inf).argmax(axis=1)
+        kinds[~playable.any(axis=1)] = -1
+        return kinds
+
+    def play(self, rows, players, kinds):
+        self.hands[players, rows, kinds] -= 1
+        self.sizes[players, rows] -= 1
+        self.discards[rows, self.top[rows]] += 1
+        self.latest[rows] = self.top[rows]
+        self.top[rows] = kinds
+
+        won = self.sizes[players, rows] == 0
+        self.winner[rows[won]] = players[won]
+        self.active[rows[won]] = False
+        rows, players, kinds = rows[~won], players[~won], kinds[~won]
+
+        colors = KIND_COLORS[kinds]
+        wild = WILDS[kinds]
+        if wild.any():
+            colors[wild] = self.pick_colors(rows[wild], players[wild])
+        self.color[rows] = colors
+
+        penalties = PENALTIES[kinds]
+        for drawn in range(penalties.max(initial=0)):
+            owed = penalties > drawn
+            self.draw(rows[owed], 1 - players[owed])
+
+        passing = ~AGAIN[kinds]
+        self.turn[rows[passing]] = 1 - players[passing]
+
+    def pick_colors(self, rows, players):
+        if not self.greedy:
+            return self.rng.integers(0, NO_COLOR, len(rows))
+        # Ties go to the color listed first, as in choose_color_counts
+        return (self.hands[players, rows] @ COLOR_MEMBERSHIP).argmax(axis=1)
+
+    def draw(self, rows, players):
+        """Give each player a card from its game's pile; return the kinds drawn (-1: none left)."""
+        empty = self.ptr[rows] >= self.end[rows]
+        if empty.any():
+            self.reshuffle(rows[empty])
+        ok = self.ptr[rows] < self.end[rows]
+        kinds = np.full(len(rows), -1, dtype=np.int64)
+        rows, players = rows[ok], players[ok]
+        kinds[ok] = self.pile[rows, self.ptr[rows]]
+        self.ptr[rows] += 1
+        self.hands[players, rows, kinds[ok]] += 1
+        self.sizes[players, rows] += 1
+        return kinds
+
+    def reshuffle(self, rows):
+        """Shuffle every discard but the latest back into the empty draw piles of rows."""
+        discards = self.discards[rows]
+        latest = self.latest[rows]
+        kept = latest >= 0
+        discards[kept, latest[kept]] -= 1
+        counts = discards.sum(axis=1, dtype=np.int64)
+
+        kinds = np.repeat(np.tile(np.arange(NUM_KINDS), len(rows)), discards.ravel())
+        owners = np.repeat(np.arange(len(rows)), counts)
+        # Sorting by owner plus a random fraction shuffles each row's cards
+        kinds = kinds[np.argsort(owners + self.rng.random(len(kinds)))]
+        starts = np.cumsum(counts) - counts
+        self.pile[rows[owners], np.arange(len(kinds)) - starts[owners]] = kinds
+
+        self.ptr[rows] = 0
+        self.end[rows] = counts
+        self.discards[rows] = 0
+        self.discards[rows[kept], latest[kept]] = 1
+
+
+def numpy_rng(rng=None):
+    """A numpy Generator seeded from rng, a random.Random, or rng itself if it is one."""
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng((rng or random).getrandbits(64))
+
+
+def rollout_values(hand, top_card, current_color=None, opponent_cards=None, rollouts=ROLLOUTS, rng=None,
+                   greedy=True, plies=ROLLOUT_PLIES, discards=()):
+    """Return {card: fraction of rollouts won} for every distinct card that can be played.
+
+    Each card gets rollouts games that start with it and are played out by
+    the greedy or random policy from deals of the cards the player cannot
+    see, those outside hand, the top card and discards (the discard pile
+    under it, first to latest): opponent_cards (default 7) to the opponent,
+    the rest to the draw pile. The discards come back when the draw pile
+    runs out. All the games run together in one Rollouts, and those still
+    running after plies moves go to the better hand.
+    """
+    if current_color is None:
+        current_color = top_card.color
+    counts = np.array(encode_hand(hand)[:NUM_KINDS], dtype=np.int16)
+    top_kind = kind_of(top_card)
+    color = color_id(current_color)
+
+    first_kinds = [kind for kind in dict.fromkeys(kind_of(card) for card in hand)
+                   if ALLOWED[color, KIND_VALUES[top_kind], kind]]
+    if not first_kinds:
+        return {}
+
+    discarded = [kind_of(card) for card in discards]
+    unseen = list(DECK_KINDS)
+    for kind in [top_kind] + [kind_of(card) for card in hand] + discarded:
+        unseen.remove(kind)
+    unseen = np.array(unseen, dtype=np.int8)
+    if opponent_cards is None:
+        opponent_cards = 7
+    opponent_cards = min(opponent_cards, len(unseen))
+
+    games = Rollouts(counts, top_kind, color, unseen, opponent_cards, rollouts * len(first_kinds), numpy_rng(rng),
+                     greedy, discarded)
+    winners = games.run(np.repeat(first_kinds, rollouts), plies)
+    wins = (winners == 0).reshape(len(first_kinds), rollouts).mean(axis=1)
+    return {find_card(hand, kind): float(won) for kind, won in zip(first_kinds, wins)}
+
+
+def rollout_card(hand, top_card, current_color=None, opponent_cards=None, rollouts=ROLLOUTS, rng=None,
+                 discards=()):
+    """The card that wins the most rollouts, or None when nothing can be played."""
+    values = rollout_values(hand, top_card, current_color, opponent_cards, rollouts, rng, discards=discards)
+    if not values:
+        return None
+    return max(values, key=values.get)
+
+
+def rollout_move(state, rng=None):
+    """Play the card get_best_move picks by rollouts rather than by search."""
+    opponent_cards = len(state.opponent.hand)
+    discards = state.deck.discards()
+    return search_move(lambda hand, top_card, color: get_best_move(hand, top_card, color, rng,
+                                                                   opponent_cards=opponent_cards,
+                                                                   rollouts=ROLLOUTS, discards=discards),
+                       state, rng)
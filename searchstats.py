@@ -0,0 +1,82 @@
+from collections import Counter
+from contextlib import contextmanager
+
+# Callables that receive the DecisionStats of every get_best_move decision.
+# While this is empty get_best_move skips collecting statistics altogether.
+HOOKS = []
+
+
+class DecisionStats:
+    """What one get_best_move decision spent its time on."""
+
+    def __init__(self):
+        self.hand_size = 0
+        self.playable = 0
+        self.seconds = 0.0
+        self.a_star_seconds = 0.0
+        self.a_star_nodes = 0
+        self.a_star_branching = 0.0
+        self.expectimax_seconds = 0.0
+        self.expectimax_nodes = 0
+        # Effective branching factor: nodes ** (1 / max_depth)
+        self.expectimax_branching = 0.0
+        self.max_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # "a_star", "expectimax", "endgame" or "rollout", or None when nothing could be played
+        self.chosen = None
+        # Which rule of get_best_move made the choice
+        self.reason = None
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def add_hook(hook):
+    HOOKS.append(hook)
+
+
+def remove_hook(hook):
+    HOOKS.remove(hook)
+
+
+def publish(stats):
+    for hook in HOOKS:
+        hook(stats)
+
+
+@contextmanager
+def collect_stats(hook=None):
+    """Install hook (by default a list's append) for the duration of a with block.
+
+    Yields the list of collected records when no hook is given.
+    """
+    records = None
+    if hook is None:
+        records = []
+        hook = records.append
+    add_hook(hook)
+    try:
+        yield records if records is not None else hook
+    finally:
+        remove_hook(hook)
+
+
+class LatencyHistogram:
+    """Hook that counts decisions per power-of-two millisecond bucket."""
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.chosen = Counter()
+
+    def __call__(self, stats):
+        bucket = 1
+        milliseconds = stats.seconds * 1000
+        while bucket < milliseconds:
+            bucket *= 2
+        self.buckets[bucket] += 1
+        self.chosen[stats.chosen] += 1
+
+    def report(self):
+        """Return (upper bound in ms, count) pairs in increasing order."""
+        return sorted(self.buckets.items())
@@ -0,0 +1,423 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import stat
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import get_best_moves
+from budget import SearchConfig
+from cardcodes import KIND_IDS, kind_of, find_card
+from engine import Engine, Move, PLAY, DRAW, COLOR, DRAW_MOVE, HUMAN, BOT, bot_move
+from transposition import TranspositionTable
+
+# Longest request line a client may send, in bytes
+MAX_LINE = 1 << 16
+# decisions_per_sec is measured over this many recent seconds
+RATE_WINDOW = 10.0
+# Most bot searches sent to a worker in one batch
+BATCH_SIZE = 32
+
+# Each worker process keeps its own search table across all the tables it
+# serves, made on its first search as large as the search limits allow
+WORKER_TABLE = None
+
+
+def search_cards(searches, think_ms, config=None):
+    """Run get_best_moves in a worker process on a batch of searches.
+
+    Each search is (hand, top_card, current_color, opponent_cards, seed);
+    return the kind of the card to play, or None, for each. config is the
+    SearchConfig every search keeps to, if any.
+    """
+    global WORKER_TABLE
+    if WORKER_TABLE is None:
+        max_stored = config.max_stored() if config is not None else None
+        WORKER_TABLE = TranspositionTable(max_stored) if max_stored is not None else TranspositionTable()
+    cards = get_best_moves([search[:4] for search in searches],
+                           [random.Random(search[4]) for search in searches],
+                           WORKER_TABLE, budget_ms=think_ms, config=config)
+    return [None if card is None else kind_of(card) for card in cards]
+
+
+def parse_card(hand, text):
+    color, _, value = str(text).partition(" ")
+    kind = KIND_IDS.get((color, value))
+    card = find_card(hand, kind) if kind is not None else None
+    if card is None:
+        raise ValueError(f"{text} is not in your hand.")
+    return card
+
+
+def parse_move(state, move):
+    """Turn a move sent by a client into an engine Move."""
+    if not isinstance(move, dict):
+        raise ValueError("A move must be an object.")
+    kind = move.get("kind")
+    if kind == PLAY:
+        return Move(PLAY, parse_card(state.current_player.hand, move.get("card")), None)
+    if kind == DRAW:
+        return DRAW_MOVE
+    if kind == COLOR:
+        return Move(COLOR, None, move.get("color"))
+    raise ValueError(f"Unknown move kind {kind!r}.")
+
+
+def describe_move(move):
+    if move.kind == PLAY:
+        return {"kind": PLAY, "card": str(move.card)}
+    if move.kind == COLOR:
+        return {"kind": COLOR, "color": move.color}
+    return {"kind": DRAW}
+
+
+class Table:
+    """One game between a client, who plays HUMAN, and the bot."""
+
+    def __init__(self, table_id, seed):
+        self.id = table_id
+        self.rng = random.Random(seed)
+        self.engine = Engine(rng=self.rng)
+        # Moves on one table are applied one at a time, in arrival order
+        self.lock = asyncio.Lock()
+        self.started = time.monotonic()
+        self.moves = 0
+        self.decisions = 0
+        self.decision_seconds = 0.0
+
+    def view(self):
+        """What the client may see of the game."""
+        state = self.engine.state
+        return {
+            "hand": [str(card) for card in state.players[HUMAN].hand],
+            "bot_cards": len(state.players[BOT].hand),
+            "deck": len(state.deck),
+            "top_card": str(state.top_card),
+            "current_color": state.current_color,
+            "turn": state.turn,
+            "waiting_for_color_choice": state.waiting_for_color_choice,
+            "drawn_card": str(state.drawn_card) if state.drawn_card is not None else None,
+            "game_over": state.game_over,
+            "winner": state.winner,
+        }
+
+    def metrics(self):
+        return {
+            "moves": self.moves,
+            "decisions": self.decisions,
+            "mean_decision_ms": self.decision_seconds / self.decisions * 1000 if self.decisions else 0.0,
+            "age_seconds": time.monotonic() - self.started,
+            "game_over": self.engine.state.game_over,
+        }
+
+
+class GameServer:
+    """Hosts many independent tables and answers line-delimited JSON requests.
+
+    Every request is one JSON object per line with an "op" and an optional
+    "id", which is echoed in the reply:
+
+        {"op": "new", "seed": 1}                        -> {"table": 1, "state": ...}
+        {"op": "move", "table": 1, "move": {...}}       -> {"bot_moves": [...], "state": ...}
+        {"op": "state", "table": 1}                     -> {"state": ...}
+        {"op": "close", "table": 1}
+        {"op": "metrics"}, {"op": "metrics", "table": 1}, {"op": "metrics", "tables": true}
+
+    A move is {"kind": "play", "card": "Red 5"}, {"kind": "draw"} or
+    {"kind": "color", "color": "Red"}. After the client's move the bot plays
+    until it is the client's turn again. Replies carry "ok", and "error" when
+    the request failed. Tables belong to the connection that opened them and
+    are closed with it.
+    """
+
+    def __init__(self, executor, think_ms=None, config=None):
+        self.executor = executor
+        self.think_ms = think_ms
+        self.config = config
+        self.tables = {}
+        self.next_table_id = 1
+        self.started = time.monotonic()
+        self.games_started = 0
+        self.games_finished = 0
+        self.decisions = 0
+        self.decision_seconds = 0.0
+        # Bot searches submitted to the executor and not finished yet
+        self.pending = 0
+        # Searches waiting to go to the executor together, with their futures
+        self.batch = []
+        self.recent_decisions = deque()
+
+    async def handle_client(self, reader, writer):
+        owned = set()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self.respond(line, owned, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for table_id in owned:
+                self.close_table(table_id)
+            writer.close()
+
+    async def respond(self, line, owned, writer):
+        request = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be an object.")
+            reply = await self.dispatch(request, owned)
+        except (ValueError, TypeError) as error:
+            reply = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # A bot search that failed in its worker; the table was rolled back
+            # by play, and the client still gets a reply instead of waiting
+            print(f"Request {line[:200]!r} failed: {error!r}", file=sys.stderr)
+            reply = {"ok": False, "error": f"The bot could not move: {error!r}"}
+        if isinstance(request, dict) and "id" in request:
+            reply["id"] = request["id"]
+        writer.write(json.dumps(reply).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, request, owned):
+        op = request.get("op")
+        if op == "new":
+            table = self.open_table(request.get("seed"))
+            owned.add(table.id)
+            return {"ok": True, "table": table.id, "state": table.view()}
+        if op == "metrics":
+            return self.metrics(request.get("table"), request.get("tables", False), owned)
+
+        table_id = request.get("table")
+        if table_id not in owned:
+            raise ValueError(f"No table {table_id!r} on this connection.")
+        table = self.tables[table_id]
+        if op == "move":
+            bot_moves = await self.play(table, request.get("move"))
+            return {"ok": True, "table": table.id, "bot_moves": bot_moves, "state": table.view()}
+        if op == "state":
+            return {"ok": True, "table": table.id, "state": table.view()}
+        if op == "close":
+            owned.discard(table_id)
+            self.close_table(table_id)
+            return {"ok": True, "table": table_id}
+        raise ValueError(f"Unknown op {op!r}.")
+
+    def open_table(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        table = Table(self.next_table_id, seed)
+        self.next_table_id += 1
+        self.tables[table.id] = table
+        self.games_started += 1
+        return table
+
+    def close_table(self, table_id):
+        self.tables.pop(table_id, None)
+
+    async def play(self, table, move):
+        """Apply the client's move, then the bot's moves; return the bot's moves.
+
+        If the bot cannot move, say because its worker died, the client's move
+        is taken back as well, so the table is as it was before the request.
+        """
+        async with table.lock:
+            engine = table.engine
+            state = engine.state
+            if state.game_over:
+                raise ValueError("The game is over.")
+            if state.turn != HUMAN:
+                raise ValueError("It is not your turn.")
+            snapshot = engine.snapshot()
+            rng_state = table.rng.getstate()
+            moves = table.moves
+            engine.apply(parse_move(state, move))
+            table.moves += 1
+
+            bot_moves = []
+            try:
+                while not state.game_over and state.turn == BOT:
+                    move = await self.decide(table)
+                    bot_moves.append(describe_move(move))
+                    engine.apply(move)
+                    table.moves += 1
+            except Exception:
+                engine.restore(snapshot)
+                table.rng.setstate(rng_state)
+                table.moves = moves
+                raise
+
+            if state.game_over:
+                self.games_finished += 1
+            return bot_moves
+
+    async def decide(self, table):
+        """Pick the bot's move, sending the search to the executor."""
+        state = table.engine.state
+        start = time.perf_counter()
+        if state.waiting_for_color_choice or state.drawn_card is not None:
+            # Nothing to search: bot_move answers these right away
+            move = bot_move(state, table.rng)
+        else:
+            hand = state.current_player.hand
+            self.pending += 1
+            try:
+                kind = await self.search(list(hand), state.top_card, state.current_color,
+                                         len(state.opponent.hand), table.rng.getrandbits(64))
+            finally:
+                self.pending -= 1
+            card = None if kind is None else find_card(hand, kind)
+            if kind is not None and card is None:
+                raise RuntimeError(f"The search picked kind {kind}, which the bot does not hold.")
+            move = DRAW_MOVE if card is None else Move(PLAY, card, None)
+
+        elapsed = time.perf_counter() - start
+        table.decisions += 1
+        table.decision_seconds += elapsed
+        self.decisions += 1
+        self.decision_seconds += elapsed
+        self.recent_decisions.append(time.monotonic())
+        return move
+
+    def search(self, *search):
+        """Queue a search for the executor; return a future for the kind to play.
+
+        Searches queued while the event loop is busy with other requests go to
+        a worker together, up to BATCH_SIZE at a time, so that many tables
+        share one round trip to the worker.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.batch.append((search, future))
+        if len(self.batch) == 1:
+            loop.call_soon(self.submit_batch)
+        elif len(self.batch) >= BATCH_SIZE:
+            self.submit_batch()
+        return future
+
+    def submit_batch(self):
+        batch = self.batch
+        if not batch:
+            return
+        self.batch = []
+        job = asyncio.get_running_loop().run_in_executor(
+            self.executor, search_cards, [search for search, _ in batch], self.think_ms, self.config)
+        job.add_done_callback(lambda job: self.deliver(batch, job))
+
+    @staticmethod
+    def deliver(batch, job):
+        futures = [future for _, future in batch]
+        if job.cancelled() or job.exception() is not None:
+            error = job.exception() if not job.cancelled() else asyncio.CancelledError()
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, kind in zip(futures, job.result()):
+            # The table's client may have gone away in the meantime
+            if not future.done():
+                future.set_result(kind)
+
+    def decisions_per_sec(self):
+        now = time.monotonic()
+        recent = self.recent_decisions
+        while recent and recent[0] < now - RATE_WINDOW:
+            recent.popleft()
+        return len(recent) / min(RATE_WINDOW, max(now - self.started, 1e-9))
+
+    def metrics(self, table_id=None, per_table=False, owned=()):
+        if table_id is not None:
+            if table_id not in owned:
+                raise ValueError(f"No table {table_id!r} on this connection.")
+            return {"ok": True, "table": table_id, **self.tables[table_id].metrics()}
+
+        report = {
+            "ok": True,
+            "open_tables": len(self.tables),
+            "active_games": sum(not table.engine.state.game_over for table in self.tables.values()),
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "decisions": self.decisions,
+            "decisions_per_sec": self.decisions_per_sec(),
+            "mean_decision_ms": self.decision_seconds / self.decisions * 1000 if self.decisions else 0.0,
+            "queue_depth": self.pending,
+            "uptime_seconds": time.monotonic() - self.started,
+        }
+        if per_table:
+            report["tables"] = {table.id: table.metrics() for table in self.tables.values()}
+        return report
+
+
+async def report_metrics(server, seconds):
+    while True:
+        await asyncio.sleep(seconds)
+        print(json.dumps(server.metrics()), file=sys.stderr)
+
+
+async def serve(host, port, unix_path, workers, think_ms, report_seconds, config=None):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        server = GameServer(executor, think_ms, config)
+        if unix_path:
+            if os.path.exists(unix_path) and stat.S_ISSOCK(os.stat(unix_path).st_mode):
+                os.unlink(unix_path)
+            listener = await asyncio.start_unix_server(server.handle_client, unix_path, limit=MAX_LINE)
+            print(f"Listening on {unix_path}", file=sys.stderr)
+        else:
+            listener = await asyncio.start_server(server.handle_client, host, port, limit=MAX_LINE)
+            print(f"Listening on {host}:{port}", file=sys.stderr)
+
+        if report_seconds:
+            asyncio.create_task(report_metrics(server, report_seconds))
+        async with listener:
+            await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many bot games over a local socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8765)
+    parser.add_argument("-u", "--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processes for bot searches (default: one per core)")
+    parser.add_argument("-t", "--think-ms", type=int, default=None,
+                        help="time budget per bot decision (default: fixed-depth search)")
+    parser.add_argument("--max-nodes", type=int, help="nodes a bot decision may expand")
+    parser.add_argument("--max-depth", type=int,
+                        help="deepest expectimax iteration, or the fixed depth without -t or --max-nodes")
+    parser.add_argument("--max-memory-kb", type=int,
+                        help="memory a bot search may keep, and the size of each worker's search table")
+    parser.add_argument("-r", "--report", type=float, default=0,
+                        help="print aggregate metrics to stderr every this many seconds")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.max_nodes is not None or args.max_depth is not None or args.max_memory_kb is not None:
+        try:
+            config = SearchConfig(args.max_nodes, args.max_depth, args.max_memory_kb, args.think_ms)
+        except ValueError as error:
+            parser.error(str(error))
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.think_ms, args.report, config))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
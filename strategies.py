@@ -0,0 +1,100 @@
+import importlib
+import random
+from collections.abc import Mapping
+
+from ai import a_star_search, expectimax, choose_color
+from engine import Move, PLAY, COLOR, DRAW_MOVE, COLOR_MOVES
+
+
+def search_move(search, state, rng):
+    """Turn a card-picking search(hand, top_card, current_color) into a policy that plays like the bot."""
+    hand = state.current_player.hand
+
+    if state.waiting_for_color_choice:
+        return Move(COLOR, None, choose_color(hand, rng))
+
+    if state.drawn_card is not None:
+        return Move(PLAY, state.drawn_card, None)
+
+    card = search(hand, state.top_card, state.current_color)
+    if card is None:
+        # The searches can give up early while a card is still playable
+        playable_cards = state.current_player.get_playable_cards(state.top_card, state.current_color)
+        card = playable_cards[0] if playable_cards else None
+    if card is not None:
+        return Move(PLAY, card, None)
+    return DRAW_MOVE
+
+
+def a_star_move(state, rng=None):
+    """Play the card chosen by a_star_search alone."""
+    return search_move(a_star_search, state, rng)
+
+
+def expectimax_move(state, rng=None):
+    """Play the card chosen by expectimax alone."""
+    return search_move(expectimax, state, rng)
+
+
+def random_move(state, rng=None):
+    """Play a random playable card, drawing only when nothing can be played."""
+    if rng is None:
+        rng = random
+
+    if state.waiting_for_color_choice:
+        return rng.choice(COLOR_MOVES)
+
+    playable_cards = state.current_player.get_playable_cards(state.top_card, state.current_color)
+    if playable_cards:
+        return Move(PLAY, rng.choice(playable_cards), None)
+    return DRAW_MOVE
+
+
+class StrategyRegistry(Mapping):
+    """Strategies by name, each a policy(state, rng) that returns a Move.
+
+    A strategy is registered either as the policy itself or as
+    "module:function"; then its module, and whatever that module imports, is
+    only loaded the first time the strategy is looked up. Listing the names or
+    checking one with `in` loads nothing.
+
+    A policy with a true tracks_opponent attribute also takes an opponent
+    keyword: the host passes it an opponent.OpponentModel that follows the
+    game for the policy's seat. One with a true uses_endgame attribute takes
+    an endgame keyword too, which hosts pass only when told to use a table.
+    """
+
+    def __init__(self, strategies=()):
+        self.strategies = dict(strategies)
+
+    def register(self, name, strategy):
+        self.strategies[name] = strategy
+
+    def __getitem__(self, name):
+        strategy = self.strategies[name]
+        if isinstance(strategy, str):
+            module, _, function = strategy.partition(":")
+            strategy = getattr(importlib.import_module(module), function)
+            self.strategies[name] = strategy
+        return strategy
+
+    def __contains__(self, name):
+        return name in self.strategies
+
+    def __iter__(self):
+        return iter(self.strategies)
+
+    def __len__(self):
+        return len(self.strategies)
+
+
+STRATEGIES = StrategyRegistry({
+    "best": "engine:bot_move",
+    "astar": a_star_move,
+    "expectimax": expectimax_move,
+    "random": random_move,
+    "ismcts": "ismcts:ismcts_move",
+    "bayes": "opponent:bayes_move",
+    "ismcts-bayes": "ismcts:ismcts_bayes_move",
+    "rollout": "rollout:rollout_move",
+})
@@ -0,0 +1,43 @@
+import random
+
+from ai import get_best_move, get_best_moves
+from deck import CARDS
+
+# Seeds the batch and scalar moves are compared on
+SEEDS = 200
+
+
+def card(text):
+    return next(card for card in CARDS if str(card) == text)
+
+
+def test_batch_matches_scalar_on_permuted_hands():
+    hand = [card(text) for text in ("Red 5", "Red 6", "Blue 3", "Green 4", "Yellow 7")]
+    top_card = card("Red 1")
+    states = []
+    for seed in range(SEEDS):
+        permuted = list(hand)
+        random.Random(seed).shuffle(permuted)
+        states.append((permuted, top_card, "Red"))
+
+    batch = get_best_moves(states, [random.Random(seed) for seed in range(SEEDS)])
+    scalar = [get_best_move(permuted, top_card, color, random.Random(seed))
+              for seed, (permuted, top_card, color) in enumerate(states)]
+    assert batch == scalar
+
+
+def test_batch_matches_scalar_on_random_positions():
+    rng = random.Random(0)
+    states = []
+    for _ in range(SEEDS):
+        cards = rng.sample(CARDS, 8)
+        hand, top_card = cards[:7], cards[7]
+        color = top_card.color if top_card.color != "Wild" else "Blue"
+        states.append((hand, top_card, color))
+        # The same cards again in another order
+        states.append((rng.sample(hand, len(hand)), top_card, color))
+
+    batch = get_best_moves(states, [random.Random(seed) for seed in range(len(states))])
+    scalar = [get_best_move(hand, top_card, color, random.Random(seed))
+              for seed, (hand, top_card, color) in enumerate(states)]
+    assert batch == scalar
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import calculate_hand_cost, evaluate_hand
+from batcheval import evaluate_batch, hand_cost_batch, evaluate_hands
+from cardcodes import encode_hand, evaluate_counts, hand_cost_counts
+from deck import CARDS
+
+# Random hands the batch scores are checked against the scalar ones on
+HANDS = 5000
+
+
+def random_hands(seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(CARDS, rng.randint(0, 30)) for _ in range(HANDS)]
+
+
+def test_batch_scores_match_scalar_scores():
+    hands = random_hands()
+    counts = [encode_hand(hand) for hand in hands]
+
+    assert evaluate_batch(counts).tolist() == [evaluate_counts(vector) for vector in counts]
+    assert hand_cost_batch(counts).tolist() == [hand_cost_counts(vector) for vector in counts]
+
+
+def test_card_lists_match_scalar_scores():
+    hands = random_hands(1)
+
+    assert evaluate_hands(hands).tolist() == [evaluate_hand(hand) for hand in hands]
+    assert [calculate_hand_cost(hand) for hand in hands] == hand_cost_batch(
+        [encode_hand(hand) for hand in hands]).tolist()
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from engine import Engine, play_game
+from eventlog import EventLog, decode_events, read_events
+from strategies import STRATEGIES
+
+# Games written to the log the reader is checked on
+GAMES = 5
+
+
+def write_log(path):
+    with EventLog(path) as log:
+        for seed in range(GAMES):
+            engine = Engine(rng=random.Random(seed), listener=log)
+            play_game(engine, [STRATEGIES["random"], STRATEGIES["random"]], 1000)
+
+
+def test_chunked_reads_match_whole_log(tmp_path):
+    path = str(tmp_path / "games.log")
+    write_log(path)
+    with open(path, "rb") as log:
+        expected = list(decode_events(log.read()))
+
+    assert len(expected) > GAMES
+    for read_size in (1, 2, 3, 7, 64, 1 << 16):
+        assert list(read_events(path, read_size)) == expected
+
+
+def test_truncated_log_is_an_error(tmp_path):
+    path = str(tmp_path / "games.log")
+    write_log(path)
+    with open(path, "rb") as log:
+        data = log.read()
+    with open(path, "wb") as log:
+        log.write(data[:-1])
+
+    with pytest.raises(ValueError):
+        list(read_events(path, 5))
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    def __init__(self, future, callback, budget, ready_at, on_error=None):
+        self.future = future
+        self.callback = callback
+        self.on_error = on_error
+        self.budget = budget
+        self.ready_at = ready_at
+
+
+class BotThinker:
+    """Runs bot decisions on a worker thread and hands the results back to the Tk loop.
+
+    Only one decision runs at a time. Its result is delivered by polling with
+    root.after, no sooner than the minimum display time after it was started,
+    so the display delay overlaps the thinking instead of adding to it.
+    """
+
+    POLL_MS = 20
+
+    def __init__(self, root):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot")
+        self.job = None
+
+    def think(self, decide, callback, min_delay_ms=0, budget=None, on_error=None):
+        """Run decide() on the worker, then callback(result) on the Tk thread.
+
+        budget is the SearchBudget decide() searches with, if any, so that
+        cancel() can stop the search early. If decide() raises, on_error is
+        called with the exception instead of callback; without on_error the
+        exception is raised on the Tk thread.
+        """
+        self.cancel()
+        ready_at = time.perf_counter() + min_delay_ms / 1000
+        job = Job(self.executor.submit(decide), callback, budget, ready_at, on_error)
+        self.job = job
+        self.root.after(self.POLL_MS, self.poll, job)
+
+    def wait(self, callback, min_delay_ms):
+        """Call callback() after min_delay_ms unless cancelled first."""
+        self.think(lambda: None, lambda _: callback(), min_delay_ms)
+
+    def poll(self, job):
+        if job is not self.job:
+            return
+
+        if not job.future.done() or time.perf_counter() < job.ready_at:
+            self.root.after(self.POLL_MS, self.poll, job)
+            return
+
+        self.job = None
+        error = job.future.exception()
+        if error is None:
+            job.callback(job.future.result())
+        elif job.on_error is not None:
+            job.on_error(error)
+        else:
+            raise error
+
+    def cancel(self):
+        """Drop the pending decision; a search in progress is told to stop."""
+        job = self.job
+        if job is None:
+            return
+        self.job = None
+        job.future.cancel()
+        if job.budget is not None:
+            job.budget.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,176 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from endgame import endgame_table
+from engine import Engine, play_game
+from opponent import bind
+from strategies import STRATEGIES
+
+MAX_MOVES = 1000
+
+
+def game_seeds(seed, games):
+    """Derive one independent seed per game from the tournament seed."""
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(games)]
+
+
+def play_match(task):
+    """Play one seeded game between strategies a and b and return its result.
+
+    Strategies swap seats every other game so that neither always moves first.
+    Strategies that can use an endgame table get the one at endgame_path, if any.
+    """
+    game, seed, a, b, endgame_path = task
+    endgame = endgame_table(endgame_path) if endgame_path is not None else None
+    names = (a, b) if game % 2 == 0 else (b, a)
+    sides = ("a", "b") if game % 2 == 0 else ("b", "a")
+
+    decisions = [0, 0]
+    decision_time = [0.0, 0.0]
+    engine = Engine(rng=random.Random(seed))
+
+    def timed(seat):
+        strategy = bind(STRATEGIES[names[seat]], engine, seat, endgame)
+
+        def policy(state, rng):
+            start = time.perf_counter()
+            move = strategy(state, rng)
+            decision_time[seat] += time.perf_counter() - start
+            decisions[seat] += 1
+            return move
+        return policy
+
+    start = time.perf_counter()
+    winner = play_game(engine, [timed(0), timed(1)], MAX_MOVES)
+
+    return {
+        "game": game,
+        "seed": seed,
+        "players": list(names),
+        "winner": sides[winner] if winner is not None else None,
+        "decisions": {sides[0]: decisions[0], sides[1]: decisions[1]},
+        "decision_time": {sides[0]: decision_time[0], sides[1]: decision_time[1]},
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_tournament(a, b, games, seed=0, processes=None, endgame_path=None):
+    """Yield per-game results as they finish, spreading games over a process pool.
+
+    The endgame table at endgame_path is only used when it is given, so a
+    seed plays the same games whether or not endgame.py has been run.
+    """
+    for name in (a, b):
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {name!r}, expected one of {sorted(STRATEGIES)}.")
+
+    tasks = [(game, game_seed, a, b, endgame_path) for game, game_seed in enumerate(game_seeds(seed, games))]
+
+    if processes == 1:
+        yield from map(play_match, tasks)
+        return
+
+    processes = processes or multiprocessing.cpu_count()
+    chunksize = max(1, games // (processes * 16))
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(play_match, tasks, chunksize)
+
+
+def wilson_interval(wins, total, z=1.96):
+    """Wilson score interval for a win rate, 95% by default."""
+    if total == 0:
+        return 0.0, 1.0
+    p = wins / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return centre - margin, centre + margin
+
+
+class Summary:
+    """Running totals over a stream of game results."""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = {"a": 0, "b": 0}
+        self.draws = 0
+        self.decisions = {"a": 0, "b": 0}
+        self.decision_time = {"a": 0.0, "b": 0.0}
+
+    def add(self, result):
+        self.games += 1
+        if result["winner"] is None:
+            self.draws += 1
+        else:
+            self.wins[result["winner"]] += 1
+        for side in ("a", "b"):
+            self.decisions[side] += result["decisions"][side]
+            self.decision_time[side] += result["decision_time"][side]
+
+    def report(self, a, b, seconds, endgame_path=None):
+        decisive = self.wins["a"] + self.wins["b"]
+        low, high = wilson_interval(self.wins["a"], decisive)
+        rate = self.wins["a"] / decisive if decisive else 0.0
+
+        def latency(side):
+            if not self.decisions[side]:
+                return 0.0
+            return self.decision_time[side] / self.decisions[side] * 1000
+
+        return {
+            "a": a,
+            "b": b,
+            "games": self.games,
+            "wins_a": self.wins["a"],
+            "wins_b": self.wins["b"],
+            "draws": self.draws,
+            "win_rate_a": rate,
+            "win_rate_a_ci95": [low, high],
+            "games_per_sec": self.games / seconds if seconds else 0.0,
+            "decision_ms_a": latency("a"),
+            "decision_ms_b": latency("b"),
+            "endgame": endgame_path,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play strategies against each other headless.")
+    parser.add_argument("a", choices=sorted(STRATEGIES))
+    parser.add_argument("b", choices=sorted(STRATEGIES))
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("-o", "--results", help="write one JSON line per game to this file")
+    parser.add_argument("-e", "--endgame", metavar="PATH",
+                        help="let the strategies that can play small hands from this endgame table")
+    args = parser.parse_args(argv)
+    if args.endgame is not None and not os.path.isfile(args.endgame):
+        parser.error(f"No endgame table at {args.endgame}; run endgame.py to make one.")
+
+    summary = Summary()
+    out = open(args.results, "w") if args.results else None
+    start = time.perf_counter()
+    try:
+        for result in run_tournament(args.a, args.b, args.games, args.seed, args.processes, args.endgame):
+            summary.add(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+    finally:
+        if out:
+            out.close()
+
+    report = summary.report(args.a, args.b, time.perf_counter() - start, args.endgame)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import random
+import sys
+from functools import partial
+
+
+def simulate(argv):
+    from tournament import main
+    return main(argv)
+
+
+def benchmark(argv):
+    from benchmark import main
+    return main(argv)
+
+
+def make_state(hand, top, current_color, opponent_cards, rng):
+    """Set up a game in which the bot is to move with the given cards.
+
+    hand and top are card names such as "Red 5" or "Wild +4". The opponent's
+    hand and the draw pile are dealt at random from the other cards.
+    """
+    from deck import CARDS, Deck
+    from engine import GameState, HUMAN, BOT
+
+    unseen = list(CARDS)
+
+    def take(text):
+        for card in unseen:
+            if str(card) == text:
+                unseen.remove(card)
+                return card
+        raise ValueError(f"No {text} left in the deck.")
+
+    hand = [take(text) for text in hand]
+    top_card = take(top)
+    if current_color is None:
+        if top_card.color == "Wild":
+            raise ValueError("A wild top card needs the active color.")
+        current_color = top_card.color
+    if opponent_cards > len(unseen):
+        raise ValueError(f"Only {len(unseen)} cards are left for the opponent.")
+
+    # Every card stays in the deck's index, so that the game can go on
+    deck = Deck(unseen + [top_card] + hand)
+    for _ in range(len(hand) + 1):
+        deck.pop()
+    deck.shuffle(rng)
+
+    state = GameState(deck)
+    state.players[BOT].hand = hand
+    state.players[HUMAN].hand = [deck.pop() for _ in range(opponent_cards)]
+    state.top_card = top_card
+    state.current_color = current_color
+    state.turn = BOT
+    return state
+
+
+def analyze(argv):
+    from card import COLORS
+    from engine import PLAY, COLOR
+    from searchstats import collect_stats
+    from strategies import STRATEGIES
+
+    parser = argparse.ArgumentParser(prog="uno.py analyze",
+                                     description="Show the move each strategy picks in one position.")
+    parser.add_argument("hand", nargs="+", help='the bot\'s cards, such as "Red 5" or "Wild +4"')
+    parser.add_argument("-t", "--top", required=True, help="the top card of the discard pile")
+    parser.add_argument("-c", "--color", choices=COLORS, help="the active color (default: the top card's)")
+    parser.add_argument("-o", "--opponent", type=int, default=7, help="cards in the opponent's hand")
+    parser.add_argument("-S", "--strategy", action="append", choices=sorted(STRATEGIES),
+                        help="strategy to ask, may be repeated (default: best)")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-e", "--endgame", metavar="PATH",
+                        help="let the strategies that can play small hands from this endgame table")
+    args = parser.parse_args(argv)
+
+    endgame = None
+    if args.endgame is not None:
+        if not os.path.isfile(args.endgame):
+            parser.error(f"No endgame table at {args.endgame}; run endgame.py to make one.")
+        from endgame import EndgameTable
+        endgame = EndgameTable(args.endgame)
+
+    try:
+        state = make_state(args.hand, args.top, args.color, args.opponent, random.Random(args.seed))
+    except ValueError as error:
+        parser.error(str(error))
+
+    moves = {}
+    for name in args.strategy or ["best"]:
+        strategy = STRATEGIES[name]
+        if getattr(strategy, "tracks_opponent", False):
+            # Nothing has been seen yet but the cards on the table
+            from opponent import OpponentModel
+            strategy = partial(strategy, opponent=OpponentModel(state, state.turn))
+        if endgame is not None and getattr(STRATEGIES[name], "uses_endgame", False):
+            strategy = partial(strategy, endgame=endgame)
+        with collect_stats() as records:
+            move = strategy(state, random.Random(args.seed))
+        moves[name] = {"kind": move.kind}
+        if move.kind == PLAY:
+            moves[name]["card"] = str(move.card)
+        elif move.kind == COLOR:
+            moves[name]["color"] = move.color
+        if records:
+            moves[name]["stats"] = records[-1].as_dict()
+
+    json.dump({
+        "hand": [str(card) for card in state.current_player.hand],
+        "top_card": str(state.top_card),
+        "current_color": state.current_color,
+        "opponent_cards": len(state.opponent.hand),
+        "moves": moves,
+    }, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+# Each command imports what it needs when it runs, so a short batch job does
+# not pay for the window, numpy or the other commands
+COMMANDS = {
+    "simulate": simulate,
+    "benchmark": benchmark,
+    "analyze": analyze,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play, time and analyze the bot without a window.",
+        epilog="Run a command with -h for its options.")
+    parser.add_argument("command", choices=COMMANDS,
+                        help="simulate: play strategies against each other; benchmark: time the "
+                             "bot's searches; analyze: show the moves picked in one position")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command](args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())